@@ -0,0 +1,82 @@
+# One parsed bootstrap-static response: players, positions, teams and gameweeks, plus dense id -> row arrays so a
+# player's position and team are array lookups rather than merges. A snapshot is shared by every page and session
+# (see data.get_bootstrap), so it is never modified after it is built: the arrays are read-only and the tables are
+# handed out as copies.
+import numpy as np
+import pandas as pd
+
+
+def _dense_index(ids):
+    # Array mapping each id to its row, -1 for ids that don't exist. FPL ids are small positive integers.
+    ids = np.asarray(ids, dtype=np.int64)
+    rows = np.full(ids.max() + 1 if len(ids) else 0, -1, dtype=np.int64)
+    rows[ids] = np.arange(len(ids))
+    return _frozen(rows)
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+class Bootstrap:
+    def __init__(self, data):
+        self._data = data
+        self._elements = pd.DataFrame(data["elements"])
+        self._element_types = pd.DataFrame(data["element_types"])
+        self._teams = pd.DataFrame(data["teams"])
+        self._events = pd.DataFrame(data["events"])
+        self.total_players = data.get("total_players", 0)
+
+        self.element_row = _dense_index(self._elements["id"])
+        self.element_type_row = _dense_index(self._element_types["id"])
+        self.team_row = _dense_index(self._teams["id"])
+
+        # Per player row: row of the player's position and of the player's team
+        self.position = _frozen(self.element_type_row[self._elements["element_type"].to_numpy()])
+        self.team = _frozen(self.team_row[self._elements["team"].to_numpy()])
+
+    @property
+    def elements(self):
+        # Shallow copies: with copy-on-write they cost nothing and callers can add columns freely
+        return self._elements.copy(deep=False)
+
+    @property
+    def element_types(self):
+        return self._element_types.copy(deep=False)
+
+    @property
+    def teams(self):
+        return self._teams.copy(deep=False)
+
+    @property
+    def events(self):
+        return self._events.copy(deep=False)
+
+    def element(self, element_id):
+        # Raw JSON record of one player, None for an unknown id
+        row = self.rows([element_id])[0]
+        return self._data["elements"][row] if row >= 0 else None
+
+    def rows(self, element_ids):
+        # Player rows of the given element ids, -1 for unknown ids
+        ids = np.asarray(element_ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(self.element_row))
+        return np.where(known, self.element_row[np.where(known, ids, 0)], -1)
+
+    def played_events(self):
+        # Finished gameweeks and the one in progress
+        return [event for event in self._data["events"] if event["finished"] or event["is_current"]]
+
+    def players(self, element_ids=None, columns=None, type_columns=("singular_name",), team_columns=("name",)):
+        # Player table with position and team columns attached by row lookup, in the order of element_ids (every
+        # player when None; unknown ids are dropped). columns restricts the player columns.
+        rows = np.arange(len(self._elements)) if element_ids is None else self.rows(element_ids)
+        rows = rows[rows >= 0]
+        elements = self._elements if columns is None else self._elements[list(columns)]
+        players_df = elements.take(rows).reset_index(drop=True)
+        for column in type_columns:
+            players_df[column] = self._element_types[column].to_numpy()[self.position[rows]]
+        for column in team_columns:
+            players_df[column] = self._teams[column].to_numpy()[self.team[rows]]
+        return players_df
@@ -1,21 +1,106 @@
-import json
-
+import numpy as np
 import pandas as pd
-import requests
 import streamlit as st
 
+from bootstrap import Bootstrap
+from fetch import fetch_element_summaries, fetch_json, fetch_many
+from form import EWM_SPAN, FORM_WINDOWS, FormMatrix
+from http_cache import IMMUTABLE, default_cache, ttl_for
+from memory import compact_frame
+from storage import (
+    final_rounds,
+    mark_final_rounds,
+    migrate_legacy_gw_csv,
+    read_element_event_facts,
+    read_gw_snapshot,
+    snapshot_rounds,
+    write_element_event_facts,
+    write_gw_round,
+    write_gw_snapshot,
+)
+from squad_selection.rating import rating_features
+
+BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+
+# Per-fixture stats that add up over the fixtures of a double gameweek
+ADDITIVE_STATS = [
+    "total_points",
+    "minutes",
+    "goals_scored",
+    "assists",
+    "clean_sheets",
+    "goals_conceded",
+    "own_goals",
+    "penalties_saved",
+    "penalties_missed",
+    "yellow_cards",
+    "red_cards",
+    "saves",
+    "bonus",
+    "bps",
+    "influence",
+    "creativity",
+    "threat",
+    "ict_index",
+    "starts",
+    "expected_goals",
+    "expected_assists",
+    "expected_goal_involvements",
+    "expected_goals_conceded",
+]
+
+# Player pool columns read by the optimizer, the planner and the pages; rating features are added to these
+PLAYER_COLUMNS = [
+    "id",
+    "web_name",
+    "first_name",
+    "second_name",
+    "full_name",
+    "team",
+    "team_name",
+    "singular_name",
+    "pos",
+    "now_cost",
+    "start_cost",
+    "points_per_game",
+    "selected_by_percent",
+    "chance_of_playing_next_round",
+    "avg_fixture_difficulty_first_5_gwks",
+]
+
+# Describe a single fixture, meaningless once a double gameweek is folded into one row
+FIXTURE_COLUMNS = ["fixture", "opponent_team", "was_home", "kickoff_time", "team_h_score", "team_a_score"]
+
 
 def get_data(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        # Parse the response content as JSON
-        json_data = json.loads(response.content)
+    # Served from the persistent response cache when fresh, otherwise fetched (and revalidated) upstream
+    json_data = fetch_json(url)
+    if json_data is not None:
         return json_data
     else:
         print("Failed to retrieve the JSON data.")
         return {}
 
 
+@st.cache_resource(ttl=ttl_for(BOOTSTRAP_URL))
+def _load_bootstrap():
+    data = fetch_json(BOOTSTRAP_URL)
+    if not data:
+        # Raised rather than returned so a failed fetch isn't cached
+        raise ConnectionError("Failed to retrieve bootstrap-static")
+    return Bootstrap(data)
+
+
+def get_bootstrap():
+    # The one bootstrap-static snapshot every page and session reads, refetched when the response goes stale.
+    # None when it can't be fetched.
+    try:
+        return _load_bootstrap()
+    except ConnectionError as e:
+        print(e)
+        return None
+
+
 # @st.cache_data
 # def get_all_players_gw_data():
 #     # Get data from the main URL
@@ -48,81 +133,233 @@ def get_data(url):
 #     return None
 
 
-@st.cache_data
-def get_all_players_per_gw_data():
-    # Get data from the main URL
-    main_url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    response = requests.get(main_url)
+def get_element_summary_history(fresh=False):
+    # Per-gameweek history of every player from one crawl of the element-summary endpoint. Upcoming fixtures are
+    # not taken from here: fixture difficulty comes from the bulk fixtures feed (see get_fixture_difficulty_matrix).
+    # fresh=True bypasses the response cache, for rows about to be marked final.
+    bootstrap = get_bootstrap()
+    if bootstrap is None:
+        return pd.DataFrame()
 
-    if response.status_code == 200:
-        data = response.json()
-        elements = data["elements"]
-        element_df = pd.DataFrame(elements)
+    player_ids = bootstrap.elements["id"].tolist()
+    summaries = fetch_element_summaries(player_ids, cache=None if fresh else default_cache)
 
-        element_types = data["element_types"]
-        element_types_df = pd.DataFrame(element_types)
+    history_dfs = [pd.DataFrame(summaries[player_id]["history"]) for player_id in player_ids if player_id in summaries]
+    return pd.concat(history_dfs, ignore_index=True) if history_dfs else pd.DataFrame()
 
-        teams = data["teams"]
-        teams_df = pd.DataFrame(teams)
 
-        all_data_dfs = []  # List to store DataFrames for each player
+def add_player_info(history_df, bootstrap):
+    # Attach names, position and team of each player to per-gameweek history rows, by row lookup into the
+    # bootstrap snapshot. Rows of players missing from the snapshot are dropped.
+    history_df = history_df[bootstrap.rows(history_df["element"]) >= 0].reset_index(drop=True)
+    info_df = bootstrap.players(
+        history_df["element"], columns=["first_name", "second_name", "element_type", "team_code"]
+    )
+    return pd.concat([history_df, info_df], axis=1)
+
+
+def get_round_history(gw, bootstrap):
+    # History rows of the current round, shaped like element-summary "history", from the event's live feed and its
+    # fixtures: two requests instead of one per player. Price, ownership and transfers are only published for
+    # "now", so the rows are provisional; once the round is over it is re-read with get_past_rounds_history.
+    live = fetch_json(f"https://fantasy.premierleague.com/api/event/{gw}/live/")
+    fixtures = fetch_json(f"https://fantasy.premierleague.com/api/fixtures/?event={gw}")
+    if not live or fixtures is None:
+        return None
+
+    fixtures_by_id = {fixture["id"]: fixture for fixture in fixtures}
+
+    rows = []
+    double_gw_players = []
+    for element in live["elements"]:
+        player = bootstrap.element(element["id"])
+        played_fixtures = [fixtures_by_id[e["fixture"]] for e in element["explain"] if e["fixture"] in fixtures_by_id]
+        if player is None or not played_fixtures:
+            continue
+        if len(played_fixtures) > 1:
+            # Live stats are summed over both fixtures, only the element-summary has them per fixture
+            double_gw_players.append(element["id"])
+            continue
+
+        fixture = played_fixtures[0]
+        was_home = fixture["team_h"] == player["team"]
+        row = {k: v for k, v in element["stats"].items() if k != "in_dreamteam"}
+        row.update(
+            element=element["id"],
+            fixture=fixture["id"],
+            opponent_team=fixture["team_a"] if was_home else fixture["team_h"],
+            was_home=was_home,
+            kickoff_time=fixture["kickoff_time"],
+            team_h_score=fixture["team_h_score"],
+            team_a_score=fixture["team_a_score"],
+            round=gw,
+            value=player["now_cost"],
+            selected=round(float(player["selected_by_percent"]) * bootstrap.total_players / 100),
+            transfers_in=player["transfers_in_event"],
+            transfers_out=player["transfers_out_event"],
+        )
+        row["transfers_balance"] = row["transfers_in"] - row["transfers_out"]
+        rows.append(row)
+
+    history_df = pd.DataFrame(rows)
+    if double_gw_players:
+        summaries = fetch_element_summaries(double_gw_players)
+        double_gw_df = pd.DataFrame(
+            [row for summary in summaries.values() for row in summary["history"] if row["round"] == gw]
+        )
+        history_df = pd.concat([history_df, double_gw_df], ignore_index=True)
+
+    return history_df
+
+
+def get_past_rounds_history(rounds, bootstrap, fresh=False):
+    # Exact history rows of rounds that are over, from every player's element-summary: price, ownership and
+    # transfers as they were in that round. One crawl serves all the rounds. Also returns whether every
+    # player's summary was fetched. fresh=True bypasses the response cache, for rows about to be marked final.
+    player_ids = bootstrap.elements["id"].tolist()
+    summaries = fetch_element_summaries(player_ids, cache=None if fresh else default_cache)
+    rounds = set(rounds)
+    history_df = pd.DataFrame(
+        [row for summary in summaries.values() for row in summary["history"] if row["round"] in rounds]
+    )
+    return history_df, len(summaries) == len(player_ids)
+
+
+def refresh_players_per_gw_data(bootstrap):
+    # Incremental refresh: only rounds that are new or were still in progress at the last refresh are fetched,
+    # and only their partitions are rewritten. Rounds that are over come from the element-summaries and are
+    # final once FPL has checked their data; the current round comes from its live feed and is never final.
+    done = final_rounds()
+    pending = [event for event in bootstrap.played_events() if event["id"] not in done]
+
+    past = [event for event in pending if not event["is_current"]]
+    if past:
+        checked = [event["id"] for event in past if event["finished"] and event.get("data_checked", False)]
+        # A summary cached before FPL checked the round's data must not be stored as final: fetch them afresh
+        past_df, complete = get_past_rounds_history([event["id"] for event in past], bootstrap, fresh=bool(checked))
+        for event in past:
+            gw = event["id"]
+            round_df = past_df[past_df["round"] == gw].reset_index(drop=True) if not past_df.empty else past_df
+            if round_df.empty:
+                continue
+            write_gw_round(add_player_info(round_df, bootstrap), gw)
+            if complete and gw in checked:
+                mark_final_rounds([gw])
+
+    for event in pending:
+        if event["is_current"]:
+            round_df = get_round_history(event["id"], bootstrap)
+            if round_df is not None and not round_df.empty:
+                write_gw_round(add_player_info(round_df, bootstrap), event["id"])
+
+    players_df = read_gw_snapshot()
+    write_element_event_facts(build_element_event_facts(players_df))
+    return players_df
 
-        # Get player data using individual API links
-        for player in elements:
-            player_id = player["id"]
-            url = f"https://fantasy.premierleague.com/api/element-summary/{player_id}/"
-            response = requests.get(url)
 
-            if response.status_code == 200:
-                player_data = response.json()
-                history_data = player_data["history"]
+@st.cache_data
+def get_all_players_per_gw_data(incremental=False):
+    bootstrap = get_bootstrap()
 
-                # Create a DataFrame from the history data
-                df = pd.DataFrame(history_data)
+    if bootstrap is not None:
+        if incremental and snapshot_rounds():
+            return refresh_players_per_gw_data(bootstrap)
 
-                # Merge the history DataFrame with the elements DataFrame based on 'element' ID
-                df = df.merge(
-                    element_df[["id", "first_name", "second_name", "element_type", "team_code"]],
-                    left_on="element",
-                    right_on="id",
-                )
+        checked_rounds = [
+            event["id"] for event in bootstrap.played_events() if event["finished"] and event.get("data_checked")
+        ]
 
-                # Merge the history DataFrame with the element_types DataFrame based on 'element_type' ID
-                df = df.merge(element_types_df[["id", "singular_name"]], left_on="element_type", right_on="id")
+        # Per-gameweek history of every player, from the element-summary crawl; fetched afresh when rounds are
+        # marked final from it, so no summary cached before FPL checked the data is kept for good
+        history_df = get_element_summary_history(fresh=bool(checked_rounds))
+        players_df = add_player_info(history_df, bootstrap)
+        write_gw_snapshot(players_df, final_rounds=checked_rounds)
 
-                # Merge the history DataFrame with the teams DataFrame based on 'team' ID
-                df = df.merge(teams_df[["code", "name"]], left_on="team_code", right_on="code")
+        # Read back with the snapshot's compact types rather than caching the wide frame the API rows came in
+        players_df = read_gw_snapshot()
+        write_element_event_facts(build_element_event_facts(players_df))
+        return players_df
 
-                all_data_dfs.append(df)
+    return None
 
-        # Concatenate all player DataFrames into a single DataFrame
-        players_df = pd.concat(all_data_dfs, ignore_index=True)
 
-        players_df.to_csv("FPLDATA/all_payer_per_gw_data.csv")
+def _upcoming_team_fixtures():
+    # One row per team per unfinished fixture, from the single bulk fixtures feed
+    fixtures = get_data("https://fantasy.premierleague.com/api/fixtures/")
+    if not fixtures:
+        return pd.DataFrame(columns=["team", "event", "difficulty"])
+
+    fixtures_df = pd.DataFrame(fixtures)
+    fixtures_df = fixtures_df[~fixtures_df["finished"].astype(bool) & fixtures_df["event"].notna()]
+    return pd.DataFrame(
+        {
+            "team": np.concatenate([fixtures_df["team_h"], fixtures_df["team_a"]]),
+            "event": np.concatenate([fixtures_df["event"], fixtures_df["event"]]).astype(int),
+            "difficulty": np.concatenate([fixtures_df["team_h_difficulty"], fixtures_df["team_a_difficulty"]]),
+        }
+    )
 
-        return players_df
 
-    return None
+@st.cache_data
+def get_fixture_difficulty_matrix():
+    # team x gameweek matrix of the difficulty of each team's unfinished fixtures.
+    # Double gameweeks hold the mean of both fixtures, blanks are NaN.
+    team_fixtures = _upcoming_team_fixtures()
+    if team_fixtures.empty:
+        return pd.DataFrame()
+    difficulty_matrix = team_fixtures.pivot_table(index="team", columns="event", values="difficulty", aggfunc="mean")
+    return difficulty_matrix.sort_index(axis=1)
+
+
+@st.cache_data
+def get_fixture_count_matrix():
+    # team x gameweek matrix of the number of unfinished fixtures: 0 for blanks, 2 for double gameweeks
+    team_fixtures = _upcoming_team_fixtures()
+    if team_fixtures.empty:
+        return pd.DataFrame()
+    count_matrix = team_fixtures.pivot_table(
+        index="team", columns="event", values="difficulty", aggfunc="size", fill_value=0
+    )
+    return count_matrix.sort_index(axis=1)
+
+
+def average_fixture_difficulty(difficulty_matrix, window=5):
+    # Average difficulty of each team's next `window` gameweeks with unfinished fixtures, indexed by team id. Taken
+    # per team: a blank, or a fixture already played in the gameweek in progress, moves that team's window one
+    # gameweek further instead of leaving it with fewer fixtures than the others.
+    if difficulty_matrix.empty:
+        return pd.Series(dtype=float)
+    upcoming = difficulty_matrix.to_numpy(dtype=float)
+    has_fixture = ~np.isnan(upcoming)
+    in_window = has_fixture & (np.cumsum(has_fixture, axis=1) <= window)
+    counts = in_window.sum(axis=1)
+    averages = np.where(in_window, upcoming, 0).sum(axis=1) / np.where(counts, counts, np.nan)
+    return pd.Series(averages, index=difficulty_matrix.index)
 
 
 @st.cache_data
 def get_all_gw_picks_data_of_a_manager(manager_id):
+    # Picks of every round played so far, fetched concurrently. Picks of finished rounds never change, so they
+    # are cached for good; only the current round is revalidated.
+    bootstrap = get_bootstrap()
     base_url = f"https://fantasy.premierleague.com/api/entry/{manager_id}/event/{{}}/picks/"
-    game_weeks = range(1, 39)  # GW 1 to 38
-    all_data_dfs = []  # List to store DataFrames for each GW
-
-    for gw in game_weeks:
-        url = base_url.format(gw)
-        response = requests.get(url)
+    played = bootstrap.played_events() if bootstrap is not None else []
+    ttls = {base_url.format(event["id"]): IMMUTABLE if event["finished"] else None for event in played}
+    results = fetch_many(list(ttls), ttl=ttls)
 
-        if response.status_code == 200:
-            gw_data = response.json()
+    all_data_dfs = []  # List to store DataFrames for each GW
+    for gw_data in results.values():
+        # Rounds before the manager joined have no picks
+        if gw_data is not None:
             event = gw_data["entry_history"]["event"]
             gw_picks = gw_data["picks"]
             gw_df = pd.DataFrame(gw_picks)
             gw_df["event"] = event
             all_data_dfs.append(gw_df)
 
+    if not all_data_dfs:
+        return pd.DataFrame()
+
     # Concatenate all GW DataFrames into a single DataFrame
     picks_df = pd.concat(all_data_dfs, ignore_index=True)
 
@@ -131,136 +368,116 @@ def get_all_gw_picks_data_of_a_manager(manager_id):
 
 @st.cache_data
 def get_all_players_info():
-    url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    response = requests.get(url)
-    if response.status_code == 200:
-        # Parse the response content as JSON
-        json_data = json.loads(response.content)
-
-        # Extract the 'element_types' information
-        element_types = json_data["element_types"]
-        element_types_df = pd.json_normalize(element_types)
-
-        # Extract the 'elements' information
-        elements = json_data["elements"]
-        elements_df = pd.json_normalize(elements)
-
-        # Extract the 'teams' information
-        teams = json_data["teams"]
-        teams_df = pd.json_normalize(teams)
-
-        # Merge the 'elements' and 'element_types' DataFrames based on the common 'element_type' field
-        merged_df = elements_df.merge(element_types_df, left_on="element_type", right_on="id")
-
-        # Merge the merged DataFrame with the 'teams' DataFrame based on the common 'team_code' field
-        final_df = merged_df.merge(teams_df, left_on="team_code", right_on="code")
-
-        return final_df
+    # Every player with the names of their position and team
+    bootstrap = get_bootstrap()
+    if bootstrap is not None:
+        return bootstrap.players(
+            type_columns=["singular_name", "singular_name_short"], team_columns=["name", "short_name"]
+        )
     else:
-        print("Failed to retrieve the JSON data.")
         return {}
 
 
-import pandas as pd
-
-
-def aggregate_total_points_for_dwg(df):
-    # Sort the DataFrame by 'id' and 'event'
-    df_sorted = df.sort_values(["element", "event"])
-
-    # Calculate the sum of 'total_points' per 'id' and 'event'
-    df["sum_total_points"] = df.groupby(["element", "event"])["total_points"].transform("sum")
-
-    # Create a mask to filter out duplicate rows
-    mask = df.duplicated(subset=["element", "event"])
-
-    # Select the unique rows based on the mask
-    unique_rows = df[~mask]
+def build_element_event_facts(players_df):
+    # One row per (element, event), sorted by event then element: double gameweek fixtures are summed, the
+    # per-fixture columns dropped. Materialized at ingestion so pages never merge or dedup at request time.
+    df = players_df.drop(columns=[c for c in FIXTURE_COLUMNS if c in players_df.columns])
+    df = df.rename(columns={"round": "event"})
+    keys = ["event", "element"]
+    additive = [c for c in ADDITIVE_STATS if c in df.columns]
+    other = [c for c in df.columns if c not in keys + additive]
+
+    grouped = df.groupby(keys, sort=True, observed=True)
+    facts = grouped[additive].sum().join(grouped[other].last())
+    facts["fixtures"] = grouped.size().astype(np.int8)
+    facts = facts.reset_index()
+    facts["event"] = facts["event"].astype(np.int16)
+    return facts
+
+
+def fact_rows(facts):
+    # Dense (event, element) -> row lookup of the fact table, -1 where there is no row
+    events = facts["event"].to_numpy(dtype=np.int64)
+    elements = facts["element"].to_numpy(dtype=np.int64)
+    rows = np.full((events.max() + 1, elements.max() + 1), -1, dtype=np.int64) if len(facts) else np.full((0, 0), -1)
+    rows[events, elements] = np.arange(len(facts))
+    return rows
+
+
+def join_picks(facts, picks_df, rows=None):
+    # Every pick with the facts of its (element, event), by array lookup instead of a merge. Picks without
+    # facts (e.g. a round not ingested yet) are kept with missing values, like a right join.
+    rows = fact_rows(facts) if rows is None else rows
+    event = picks_df["event"].to_numpy(dtype=np.int64)
+    element = picks_df["element"].to_numpy(dtype=np.int64)
+    known = (event < rows.shape[0]) & (element < rows.shape[1])
+    take = np.full(len(picks_df), -1, dtype=np.int64)
+    take[known] = rows[event[known], element[known]]
+
+    fact_columns = {
+        column: pd.api.extensions.take(facts[column].array, take, allow_fill=True)
+        for column in facts.columns.drop(["event", "element"])
+    }
+    return pd.concat([picks_df.reset_index(drop=True), pd.DataFrame(fact_columns)], axis=1)
 
-    # Drop the 'total_points' column from the unique rows
-    unique_rows = unique_rows.drop("total_points", axis=1)
 
-    # Rename the 'sum_total_points' column to 'total_points'
-    unique_rows = unique_rows.rename(columns={"sum_total_points": "total_points"})
-
-    # Reset the index of the unique rows
-    unique_rows = unique_rows.reset_index(drop=True)
-
-    return unique_rows
+@st.cache_data
+def read_in_element_event_facts(columns=None):
+    try:
+        return read_element_event_facts(columns=columns)
+    except FileNotFoundError:
+        pass
+    # Built once from a snapshot written before the fact table existed
+    players_df = read_in_all_players_gw_data()
+    if players_df.empty:
+        return pd.DataFrame()
+    facts = build_element_event_facts(players_df)
+    write_element_event_facts(facts)
+    return facts if columns is None else facts[list(columns)]
 
 
 @st.cache_data
-def read_in_all_players_gw_data():
+def read_in_all_players_gw_data(columns=None, rounds=None):
+    # Read only the requested columns (and rounds) of the columnar per-gameweek snapshot
+    try:
+        return read_gw_snapshot(columns=columns, rounds=rounds)
+    except FileNotFoundError:
+        pass
     try:
-        df = pd.read_csv("FPLData/all_payer_per_gw_data.csv")
-        return df
+        # No snapshot yet: migrate the one older versions wrote as CSV, if there is one
+        migrate_legacy_gw_csv()
+        return read_gw_snapshot(columns=columns, rounds=rounds)
     except Exception as e:
         print(e)
         return pd.DataFrame()
 
 
-def merge_data(players_fpl_stats, player_picks_data):
-    final_df = players_fpl_stats.merge(
-        player_picks_data, left_on=["element", "round"], right_on=["element", "event"], how="right"
-    )
-    return final_df
+@st.cache_data
+def get_form_matrix(windows=FORM_WINDOWS, span=EWM_SPAN):
+    # Form of every player and gameweek, built once per snapshot of the fact table
+    facts = read_in_element_event_facts(columns=["element", "event", "total_points", "second_name"])
+    return FormMatrix.from_facts(facts, windows=windows, span=span)
 
 
 # @st.cache_data
-def prepare_player_data():
-    main_url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    response = requests.get(main_url)
-    # Extract the dataframes from the data_dict
-    if response.status_code == 200:
-        data_dict = response.json()
-        elements_df = pd.DataFrame(data_dict["elements"])
-        element_types_df = pd.DataFrame(data_dict["element_types"])
-        teams_df = pd.DataFrame(data_dict["teams"])
-
-        # Merge elements_df with element_types_df
-        merged_df = pd.merge(elements_df, element_types_df, how="inner", left_on="element_type", right_on="id")
+def prepare_player_data(fixture_window=5):
+    bootstrap = get_bootstrap()
+    if bootstrap is not None:
+        # Position and team by row lookup in the shared snapshot; "id" stays the element id
+        merged_df = bootstrap.players()
         merged_df["pos"] = merged_df["singular_name"]
-
-        # Merge the result with teams_df
-        merged_df = pd.merge(merged_df, teams_df, how="inner", left_on="team_code", right_on="code")
         merged_df["team_name"] = merged_df["name"]
 
         # Calculate start_cost and full_name
         merged_df["start_cost"] = merged_df["now_cost"] / 10
         merged_df["full_name"] = merged_df["first_name"] + " " + merged_df["second_name"]
 
-        # Initialize a list to store the average fixture difficulties for each player
-        avg_fixture_difficulties = []
-
-        # Iterate over each player to fetch fixture data and calculate average fixture difficulties
-        for player in data_dict["elements"]:
-            player_id = player["id"]
-            url = f"https://fantasy.premierleague.com/api/element-summary/{player_id}/"
-            response = requests.get(url)
-            player_data = response.json()
-            fixtures = player_data["fixtures"]
-
-            # Initialize a list to store fixture difficulties for each window
-            fixture_difficulties_window = []
-            gameweeks_not_finished = 0
-
-            # Iterate over the fixtures to calculate average fixture difficulty for the first 5 gameweeks that are not
-            # finished
-            for fixture in fixtures:
-                if not fixture["finished"]:
-                    fixture_difficulty = fixture["difficulty"]
-                    fixture_difficulties_window.append(fixture_difficulty)
-                    gameweeks_not_finished += 1
-
-                if gameweeks_not_finished >= 5:
-                    break
-
-            # Calculate the overall average fixture difficulty for the player
-            avg_fixture_difficulty = sum(fixture_difficulties_window) / len(fixture_difficulties_window)
-            avg_fixture_difficulties.append(avg_fixture_difficulty)
-
-        # Add the average fixture difficulties to the merged_df dataframe
-        merged_df["avg_fixture_difficulty_first_5_gwks"] = avg_fixture_difficulties
+        # Average difficulty of the next `fixture_window` gameweeks, broadcast to players by team. The column keeps
+        # its avg_fixture_difficulty_first_5_gwks name whatever the window: squad_selection/rating_weights.json, the
+        # planner and the optimizer output refer to it by that name.
+        difficulty_matrix = get_fixture_difficulty_matrix()
+        avg_fixture_difficulties = average_fixture_difficulty(difficulty_matrix, window=fixture_window)
+        merged_df["avg_fixture_difficulty_first_5_gwks"] = merged_df["team"].map(avg_fixture_difficulties)
 
         # Convert necessary columns to numeric data types and fill NaN values with zeros
         numeric_columns = [
@@ -275,8 +492,13 @@ def prepare_player_data():
             "clean_sheets",
             "avg_fixture_difficulty_first_5_gwks",
             "selected_by_percent",
+            "points_per_game",
         ]
+        # The API sends many stats as strings ("0.53"); every rating feature is parsed once here
+        numeric_columns += [c for c in rating_features() if c in merged_df.columns and c not in numeric_columns]
         merged_df[numeric_columns] = merged_df[numeric_columns].apply(pd.to_numeric, errors="coerce").fillna(0)
 
-        return merged_df
+        # Only the columns used downstream, with categorical names and small integers. Floats stay float64: they
+        # are the optimizer's coefficients, and a few hundred players cost next to nothing either way.
+        return compact_frame(merged_df, PLAYER_COLUMNS + rating_features(), floats=False)
     return []
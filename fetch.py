@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import default_cache, ttl_for
+
+BASE_URL = "https://fantasy.premierleague.com/api"
+
+MAX_WORKERS = 16
+TIMEOUT = 10  # seconds, per request
+RETRIES = 3
+BACKOFF = 0.5  # seconds, doubled after every failed attempt
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=MAX_WORKERS):
+    # One keep-alive session for the whole process, shared by every thread and every fetch_many call, so
+    # connections to the FPL API are reused from one crawl to the next. Its pool holds a connection per worker.
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+class RateLimiter:
+    # Token bucket shared by every thread using it: on average at most `rate` requests per second, in bursts of
+    # up to `burst`
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_json(
+    url,
+    session=None,
+    timeout=TIMEOUT,
+    retries=RETRIES,
+    backoff=BACKOFF,
+    cache=default_cache,
+    ttl=None,
+    limiter=None,
+):
+    # Serve from the on-disk cache while fresh; once stale, revalidate with ETag / If-Modified-Since.
+    # Pass cache=None to always go to the network. Every network request waits for the limiter, if given.
+    entry = cache.get(url) if cache is not None else None
+    ttl = ttl_for(url) if ttl is None else ttl
+    if entry is not None and cache.is_fresh(entry, ttl):
+        return entry["body"]
+
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    session = session or get_session()
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = session.get(url, timeout=timeout, headers=headers)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        else:
+            if response.status_code == 304 and entry is not None:
+                return cache.refresh(entry)["body"]
+            if response.status_code == 200:
+                body = response.json()
+                if cache is not None:
+                    cache.put(
+                        url,
+                        body,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+                return body
+            if response.status_code not in RETRY_STATUS_CODES:
+                print(f"Failed to retrieve {url}: HTTP {response.status_code}")
+                return None
+            error = f"HTTP {response.status_code}"
+
+        if attempt < retries:
+            time.sleep(backoff * 2**attempt)
+
+    # Upstream unavailable: a stale copy beats no data
+    if entry is not None:
+        print(f"Failed to revalidate {url} ({error}), serving cached copy")
+        return entry["body"]
+
+    print(f"Failed to retrieve {url} after {retries + 1} attempts: {error}")
+    return None
+
+
+def fetch_many(
+    urls,
+    max_workers=MAX_WORKERS,
+    timeout=TIMEOUT,
+    retries=RETRIES,
+    backoff=BACKOFF,
+    cache=default_cache,
+    ttl=None,
+    limiter=None,
+):
+    # Fetch all urls with at most max_workers requests in flight; returns {url: json or None} in input order.
+    # ttl applies to every url, or can be a {url: ttl} dict.
+    urls = list(urls)
+    if not urls:
+        return {}
+
+    def _fetch(url):
+        url_ttl = ttl.get(url) if isinstance(ttl, dict) else ttl
+        return fetch_json(
+            url, timeout=timeout, retries=retries, backoff=backoff, cache=cache, ttl=url_ttl, limiter=limiter
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_fetch, urls))
+
+    return dict(zip(urls, results))
+
+
+def element_summary_url(player_id, base_url=BASE_URL):
+    return f"{base_url}/element-summary/{player_id}/"
+
+
+def fetch_element_summaries(player_ids, base_url=BASE_URL, max_workers=MAX_WORKERS, cache=default_cache):
+    # Returns {player_id: element-summary json}; players whose summary could not be fetched are left out.
+    # cache=None fetches every summary from the API, with no cached or stale copy standing in for a failed request.
+    player_ids = list(player_ids)
+    urls = [element_summary_url(player_id, base_url) for player_id in player_ids]
+    results = fetch_many(urls, max_workers=max_workers, cache=cache)
+    return {player_id: results[url] for player_id, url in zip(player_ids, urls) if results[url] is not None}
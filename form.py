@@ -0,0 +1,80 @@
+# Players x gameweeks form of every player at once: rolling averages of points over several windows and an
+# exponentially weighted average, computed once per data snapshot with NumPy. The form guide and any rating
+# feature that uses form slice it instead of running a groupby-rolling per player.
+import numpy as np
+import pandas as pd
+
+FORM_WINDOWS = (3, 5, 10)
+MIN_PERIODS = 3  # gameweeks with a fixture needed before a rolling average is shown
+EWM_SPAN = 5
+
+
+def rolling_mean(points, window, min_periods=MIN_PERIODS):
+    # Mean of the last `window` gameweeks along axis 1, skipping gameweeks without a fixture (NaN)
+    played = ~np.isnan(points)
+    total = np.pad(np.cumsum(np.where(played, points, 0), axis=1), ((0, 0), (1, 0)))
+    count = np.pad(np.cumsum(played, axis=1), ((0, 0), (1, 0)))
+    start = np.maximum(np.arange(1, points.shape[1] + 1) - window, 0)
+    total = total[:, 1:] - total[:, start]
+    count = count[:, 1:] - count[:, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count >= min_periods, total / count, np.nan)
+
+
+def ewm_mean(points, span=EWM_SPAN):
+    # Exponentially weighted mean along axis 1, as pandas ewm(span, adjust=True); blank gameweeks only decay
+    alpha = 2 / (span + 1)
+    numerator = np.zeros(len(points))
+    denominator = np.zeros(len(points))
+    out = np.empty(points.shape)
+    for t in range(points.shape[1]):
+        played = ~np.isnan(points[:, t])
+        numerator = numerator * (1 - alpha) + np.where(played, points[:, t], 0)
+        denominator = denominator * (1 - alpha) + played
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, t] = numerator / denominator
+    return out
+
+
+class FormMatrix:
+    def __init__(self, elements, rounds, points, names, windows=FORM_WINDOWS, span=EWM_SPAN):
+        # points: players x rounds total points, NaN where the player had no fixture
+        self.elements = elements
+        self.rounds = rounds
+        self.points = points
+        self.names = names
+        self.rolling = {window: rolling_mean(points, window) for window in windows}
+        self.ewm = ewm_mean(points, span)
+        self._row_of = pd.Series(np.arange(len(elements)), index=elements)
+
+    @classmethod
+    def from_facts(cls, facts, windows=FORM_WINDOWS, span=EWM_SPAN):
+        # From the (element, event) fact table: one cell per player and gameweek, double gameweeks already summed
+        elements, element_rows = np.unique(facts["element"].to_numpy(), return_inverse=True)
+        rounds, round_columns = np.unique(facts["event"].to_numpy(), return_inverse=True)
+        points = np.full((len(elements), len(rounds)), np.nan)
+        points[element_rows, round_columns] = facts["total_points"].to_numpy(dtype=float)
+        names = facts.groupby("element", observed=True)["second_name"].last().reindex(elements).to_numpy()
+        return cls(elements, rounds, points, names, windows=windows, span=span)
+
+    def form(self, window=5):
+        # window is one of the rolling windows, or "ewm"
+        return self.ewm if window == "ewm" else self.rolling[window]
+
+    def latest(self, window=5):
+        # Most recent form of every player, indexed by element id
+        form = self.form(window)
+        return pd.Series(form[:, -1] if form.shape[1] else np.nan, index=self.elements)
+
+    def frame(self, elements, window=5):
+        # Long frame (element, second_name, round, form_guide) of the given players
+        rows = self._row_of.reindex(elements).dropna().astype(int).to_numpy()
+        form = self.form(window)[rows]
+        return pd.DataFrame(
+            {
+                "element": np.repeat(self.elements[rows], len(self.rounds)),
+                "second_name": np.repeat(self.names[rows], len(self.rounds)),
+                "round": np.tile(self.rounds, len(rows)),
+                "form_guide": form.ravel(),
+            }
+        )
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+CACHE_DIR = os.environ.get("FPL_CACHE_DIR", ".fpl_cache")
+MAX_BYTES = int(os.environ.get("FPL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+IMMUTABLE = float("inf")  # ttl for responses that never change, e.g. picks of a finished gameweek
+
+# Time-to-live in seconds per endpoint, first matching pattern wins
+TTL_RULES = [
+    (re.compile(r"/bootstrap-static/"), 5 * 60),
+    (re.compile(r"/fixtures/"), 30 * 60),
+    (re.compile(r"/event/\d+/live/"), 2 * 60),
+    (re.compile(r"/element-summary/\d+/"), 60 * 60),
+    (re.compile(r"/entry/\d+/event/\d+/picks/"), 60 * 60),
+    (re.compile(r"/entry/\d+/history/"), 60 * 60),
+    (re.compile(r"/leagues-classic/\d+/standings/"), 15 * 60),
+]
+DEFAULT_TTL = 10 * 60
+
+
+def ttl_for(url):
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+
+class ResponseCache:
+    # On-disk JSON response cache keyed by URL, shared by every process pointing at the same directory.
+    # Entries are written atomically and evicted least-recently-used once the directory exceeds max_bytes.
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None  # bytes on disk, computed lazily
+        self._lock = threading.Lock()
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        # Bump the mtime so eviction drops the least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, url, body, etag=None, last_modified=None):
+        entry = {"url": url, "stored_at": time.time(), "etag": etag, "last_modified": last_modified, "body": body}
+        self._write(url, entry)
+        return entry
+
+    def refresh(self, entry):
+        # Upstream confirmed (304) that the cached body is still current
+        entry["stored_at"] = time.time()
+        self._write(entry["url"], entry)
+        return entry
+
+    @staticmethod
+    def is_fresh(entry, ttl):
+        return time.time() - entry["stored_at"] < ttl
+
+    def _write(self, url, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = json.dumps(entry, separators=(",", ":"))
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return []
+
+    def _disk_usage(self):
+        return sum(e.stat().st_size for e in self._entries())
+
+    def _evict(self):
+        # Other processes share the directory, so rescan instead of trusting the running total
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        size = sum(e.stat().st_size for e in entries)
+        target = self.max_bytes * 0.9
+        for e in entries:
+            if size <= target:
+                break
+            try:
+                size -= e.stat().st_size
+                os.remove(e.path)
+            except OSError:
+                pass
+        self._size = size
+
+    def clear(self):
+        for e in self._entries():
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+        with self._lock:
+            self._size = 0
+
+
+default_cache = ResponseCache()
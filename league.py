@@ -0,0 +1,129 @@
+# Bulk ingestion of a classic mini-league: standings, season history and picks of every manager, streamed to
+# FPLData/leagues/<league id>/ in batches. Interrupted runs resume where they stopped.
+# Run with: python league.py <league id>
+import itertools
+import sys
+
+import pandas as pd
+
+from fetch import BASE_URL, RateLimiter, fetch_json, fetch_many
+from storage import ingested_entries, next_league_batch, write_league_batch
+
+BATCH_SIZE = 200  # managers held in memory at a time
+MAX_WORKERS = 8  # requests in flight
+RATE = 20  # requests per second, across all workers
+
+STANDINGS_COLUMNS = {
+    "entry": "int32",
+    "entry_name": "string",
+    "player_name": "string",
+    "rank": "int32",
+    "total": "int32",
+}
+# Nullable integers: older seasons and new managers miss some of these fields
+HISTORY_COLUMNS = {
+    "entry": "Int32",
+    "event": "Int8",
+    "points": "Int16",
+    "total_points": "Int16",
+    "rank": "Int32",
+    "overall_rank": "Int32",
+    "bank": "Int16",
+    "value": "Int16",
+    "event_transfers": "Int8",
+    "event_transfers_cost": "Int16",
+    "points_on_bench": "Int16",
+}
+PICKS_COLUMNS = {
+    "entry": "int32",
+    "event": "int8",
+    "element": "int16",
+    "position": "int8",
+    "multiplier": "int8",
+    "is_captain": "bool",
+    "is_vice_captain": "bool",
+}
+
+
+def standings_url(league_id, page):
+    return f"{BASE_URL}/leagues-classic/{league_id}/standings/?page_standings={page}"
+
+
+def league_standings(league_id, limiter=None):
+    # Standings rows one page at a time, so the league is never held in memory as a whole
+    for page in itertools.count(1):
+        data = fetch_json(standings_url(league_id, page), limiter=limiter)
+        if not data:
+            return
+        yield from data["standings"]["results"]
+        if not data["standings"]["has_next"]:
+            return
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+def _frame(rows, columns):
+    df = pd.DataFrame(rows, columns=list(columns))
+    return df.astype(columns)
+
+
+def _fetch_batch(standings, limiter, max_workers):
+    # History, then picks of the rounds each manager played. Responses go straight to the columnar store, not to
+    # the response cache, where thousands of managers would evict everything else.
+    entries = [row["entry"] for row in standings]
+    history_urls = {entry: f"{BASE_URL}/entry/{entry}/history/" for entry in entries}
+    histories = fetch_many(history_urls.values(), max_workers=max_workers, cache=None, limiter=limiter)
+
+    picks_urls = {}
+    for entry in entries:
+        history = histories[history_urls[entry]]
+        if history is not None:
+            for gw in history["current"]:
+                picks_urls[entry, gw["event"]] = f"{BASE_URL}/entry/{entry}/event/{gw['event']}/picks/"
+    picks = fetch_many(picks_urls.values(), max_workers=max_workers, cache=None, limiter=limiter)
+
+    # Only managers with every response are written; the rest are retried on the next run
+    failed = {entry for entry in entries if histories[history_urls[entry]] is None}
+    failed |= {entry for (entry, _), url in picks_urls.items() if picks[url] is None}
+    complete = [entry for entry in entries if entry not in failed]
+
+    history_rows = [{**gw, "entry": entry} for entry in complete for gw in histories[history_urls[entry]]["current"]]
+    picks_rows = [
+        {**pick, "entry": entry, "event": event}
+        for (entry, event), url in picks_urls.items()
+        if entry not in failed
+        for pick in picks[url]["picks"]
+    ]
+    tables = {
+        "standings": _frame([row for row in standings if row["entry"] not in failed], STANDINGS_COLUMNS),
+        "history": _frame(history_rows, HISTORY_COLUMNS),
+        "picks": _frame(picks_rows, PICKS_COLUMNS),
+    }
+    return tables, complete
+
+
+def ingest_league(league_id, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS, rate=RATE):
+    # Fetch every manager of the league under one rate limit, writing each batch as soon as it is complete.
+    # Returns the number of managers ingested by this run.
+    done = ingested_entries(league_id)
+    batch = next_league_batch(league_id)
+    limiter = RateLimiter(rate)
+
+    pending = (row for row in league_standings(league_id, limiter) if row["entry"] not in done)
+    ingested = 0
+    for standings in _chunks(pending, batch_size):
+        tables, complete = _fetch_batch(standings, limiter, max_workers)
+        if complete:
+            write_league_batch(league_id, batch, tables, complete)
+            batch += 1
+        ingested += len(complete)
+        print(f"League {league_id}: {ingested} managers ingested, {len(standings) - len(complete)} to retry")
+    return ingested
+
+
+if __name__ == "__main__":
+    ingest_league(int(sys.argv[1]))
@@ -7,13 +7,14 @@ pd.set_option("display.max_rows", None)
 import plotly.graph_objects as go
 import streamlit as st
 from data import (
-    aggregate_total_points_for_dwg,
     get_all_gw_picks_data_of_a_manager,
     get_all_players_per_gw_data,
     get_data,
-    merge_data,
+    get_form_matrix,
+    join_picks,
     prepare_player_data,
     read_in_all_players_gw_data,
+    read_in_element_event_facts,
 )
 from plotting import (
     player_form_guide,
@@ -22,14 +23,8 @@ from plotting import (
     plot_points_per_event,
     plot_season_points,
 )
-from squad_selection.optimiztion import (
-    calculate_player_rating,
-    select_squad,
-    squad_selection_defence,
-    squad_selection_forwards,
-    squad_selection_gk,
-    squad_selection_midfield,
-)
+from squad_selection.optimiztion import SquadOptimizer, select_squad
+from squad_selection.rating import rate_players
 
 st.set_option("deprecation.showPyplotGlobalUse", False)
 
@@ -83,6 +78,14 @@ st.markdown(
 )
 
 
+@st.cache_resource
+def get_squad_optimizer(players_df):
+    # Built once per player snapshot and shared by every session; widget changes only re-solve it.
+    # Each solve also picks the starting XI, bench order and captain, so the model is built on the pruned pool
+    # to keep a re-solve under a second.
+    return SquadOptimizer(players_df, lineup=True, prune=True)
+
+
 def long_running_process():
     # Simulate a long-running process
     for i in range(4):
@@ -97,8 +100,12 @@ if __name__ == "__main__":
     # option = st.sidebar.radio("", ["Squad selection"])
     #
     # if option == "Squad selection":
-    stats_df = pd.read_csv("FPLData/all_payer_per_gw_data.csv")
-    stats_df["full_name"] = stats_df["first_name"] + " " + stats_df["second_name"]
+    stats_df = read_in_all_players_gw_data(
+        columns=["element", "round", "first_name", "second_name", "singular_name", "total_points"]
+    )
+    stats_df["full_name"] = (stats_df["first_name"].astype(str) + " " + stats_df["second_name"].astype(str)).astype(
+        "category"
+    )
 
     fw_df = stats_df[stats_df["singular_name"] == "Forward"]
     mid_df = stats_df[stats_df["singular_name"] == "Midfielder"]
@@ -159,7 +166,7 @@ if __name__ == "__main__":
     st.write("---")
 
     fpl_players_data = prepare_player_data()
-    fpl_players_data["rating"] = fpl_players_data.apply(calculate_player_rating, axis=1)
+    fpl_players_data["rating"] = rate_players(fpl_players_data)
     # fpl_players_data = fpl_players_data[fpl_players_data["chance_of_playing_next_round"].isna()]
     # st.write(fpl_players_data.head(1).T)
 
@@ -197,48 +204,30 @@ if __name__ == "__main__":
             f"Your total budget of **{float(fwds) + float(mids) + float(defs) + float(gks)}** is above the allocated **100** for squad selection"
         )
 
-    include_df = fpl_players_data[fpl_players_data["web_name"].isin(include)]
-    exclude_df = fpl_players_data[fpl_players_data["web_name"].isin(exclude)]
-
-    gk_list_include, def_list_include, mid_list_include, fwd_list_include = [
-        include_df[include_df["pos"] == pos]["web_name"].tolist()
-        for pos in ["Goalkeeper", "Defender", "Midfielder", "Forward"]
-    ]
-    gk_list_exclude, def_list_exclude, mid_list_exclude, fwd_list_exclude = [
-        exclude_df[exclude_df["pos"] == pos]["web_name"].tolist()
-        for pos in ["Goalkeeper", "Defender", "Midfielder", "Forward"]
-    ]
-
-    selected_fwds_df = squad_selection_forwards(
-        df=fpl_players_data,
-        total_cost=float(fwds),
-        include_players=fwd_list_include,
-        exclude_players=fwd_list_exclude,
-    )
-    selected_mids_df = squad_selection_midfield(
-        df=fpl_players_data,
-        total_cost=float(mids),
-        include_players=mid_list_include,
-        exclude_players=mid_list_exclude,
-    )
-    selected_defs_df = squad_selection_defence(
-        df=fpl_players_data,
-        total_cost=float(defs),
-        include_players=def_list_include,
-        exclude_players=def_list_exclude,
-    )
-    selected_gks_df = squad_selection_gk(
-        df=fpl_players_data, total_cost=float(gks), include_players=gk_list_include, exclude_players=gk_list_exclude
+    # One solve for the whole squad, so the 3 players per team rule holds across positions
+    solve_start = time.perf_counter()
+    squad_df = get_squad_optimizer(fpl_players_data).solve(
+        budgets={"Goalkeeper": gks, "Defender": defs, "Midfielder": mids, "Forward": fwds},
+        include_players=include,
+        exclude_players=exclude,
     )
+    solve_time = time.perf_counter() - solve_start
     with st.spinner("Squad selection in progess..."):
         long_running_process()
 
+    if not len(squad_df):
+        st.write("No legal squad fits these budgets and include/exclude choices, adjust them and try again")
+    else:
         # After the long process is done, remove the spinner and show the result
         st.success("Squad selection complete!")
-
-        squad_df = pd.concat([selected_gks_df, selected_defs_df, selected_mids_df, selected_fwds_df], ignore_index=True)
-        st.write("Selected_squad")
-        st.dataframe(squad_df.sort_values("pos"))
+        st.caption(f"Squad and team sheet solved in {solve_time:.2f} s")
+
+        squad_df = squad_df.sort_values("squad_position")
+        squad_df["role"] = np.select([squad_df["captain"], squad_df["vice_captain"]], ["C", "V"], default="")
+        st.write("Starting XI")
+        st.dataframe(squad_df[squad_df["squad_position"] <= 11])
+        st.write("Bench, in substitution order")
+        st.dataframe(squad_df[squad_df["squad_position"] > 11])
         st.write("Total cost of selected squad using allocated budgets :", squad_df["start_cost"].sum())
         st.write(f"Cost break down of selected squad per pos:")
         st.dataframe(squad_df.groupby("pos")["start_cost"].sum().rename("total_cost").reset_index())
@@ -259,9 +248,8 @@ if __name__ == "__main__":
         default=["Erling " "Haaland", "Harry Kane"],
     )
     if len(selected_players):
-        st.plotly_chart(
-            player_form_guide(stats_df[stats_df["full_name"].isin(selected_players)]), use_container_width=True
-        )
+        selected_elements = stats_df.loc[stats_df["full_name"].isin(selected_players), "element"].unique()
+        st.plotly_chart(player_form_guide(get_form_matrix(), selected_elements), use_container_width=True)
 
     st.write("---")
 
@@ -282,12 +270,12 @@ if __name__ == "__main__":
     #
     #         fpl_manager_gw_data = get_data(url)
     #         # Get all players' data
-    #         players_fpl_stats = read_in_all_players_gw_data()  # get_all_players_per_gw_data()
+    #         # Per (element, event) facts, double gameweeks already summed
+    #         players_fpl_stats = read_in_element_event_facts()
     #         # Get gameweek picks data for a specific player
     #         player_picks_data = get_all_gw_picks_data_of_a_manager(fpl_manager_id)
     #
-    #         final_df = merge_data(players_fpl_stats=players_fpl_stats, player_picks_data=player_picks_data)
-    #         final_df = aggregate_total_points_for_dwg(final_df)
+    #         final_df = join_picks(players_fpl_stats, player_picks_data)
     #
     #         if len(fpl_manager_gw_data):
     #             col1, col2 = st.columns(2)
@@ -0,0 +1,91 @@
+# Memory-compact pandas frames and a report of what one season of data costs in memory. Every Streamlit worker
+# holds its own copy of the cached tables, so their footprint is paid once per worker.
+# Run with: python memory.py
+import numpy as np
+import pandas as pd
+
+CATEGORY_MAX_SHARE = 0.5  # strings become categoricals when at most this share of the values are distinct
+
+
+def compact_frame(df, columns=None, floats=True):
+    # Only the given columns (those present), repeated strings as categoricals, integers in the smallest type that
+    # holds them and, with floats=True, floats as float32
+    if columns is not None:
+        df = df[[c for c in dict.fromkeys(columns) if c in df.columns]]
+    compact = {}
+    for name, column in df.items():
+        if pd.api.types.is_bool_dtype(column) or isinstance(column.dtype, pd.CategoricalDtype):
+            compact[name] = column
+        elif pd.api.types.is_integer_dtype(column):
+            compact[name] = pd.to_numeric(column, downcast="integer")
+        elif pd.api.types.is_float_dtype(column):
+            compact[name] = column.astype(np.float32) if floats else column
+        elif column.nunique() <= CATEGORY_MAX_SHARE * len(column):
+            compact[name] = column.astype("category")
+        else:
+            compact[name] = column
+    return pd.DataFrame(compact, index=df.index)
+
+
+def expanded_frame(df):
+    # The same table with the default pandas types (object strings, 64 bit numbers), for comparison
+    wide = {}
+    for name, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            wide[name] = column.astype(object)
+        elif pd.api.types.is_integer_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            wide[name] = column.astype(np.int64)
+        elif pd.api.types.is_float_dtype(column):
+            wide[name] = column.astype(np.float64)
+        else:
+            wide[name] = column
+    return pd.DataFrame(wide, index=df.index)
+
+
+def footprint(obj):
+    # Bytes held by a frame (strings included), an array, or the arrays of an object such as FormMatrix
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    return sum(value.nbytes for value in vars(obj).values() if isinstance(value, np.ndarray))
+
+
+def memory_report(tables):
+    # {name: frame or array holder} -> rows, compact and default-types size of each, in MB
+    rows = []
+    for name, table in tables.items():
+        is_frame = isinstance(table, pd.DataFrame)
+        size = footprint(table)
+        rows.append(
+            {
+                "table": name,
+                "rows": len(table) if is_frame else None,
+                "columns": table.shape[1] if is_frame else None,
+                "mb": size / 2**20,
+                "default_types_mb": footprint(expanded_frame(table)) / 2**20 if is_frame else size / 2**20,
+            }
+        )
+    report = pd.DataFrame(rows)
+    total = {"table": "total", "mb": report["mb"].sum(), "default_types_mb": report["default_types_mb"].sum()}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    return report.astype({"rows": "Int64", "columns": "Int64"})
+
+
+def season_memory_report():
+    # Footprint of the tables a worker caches for the current season
+    # Imported here: data uses compact_frame
+    from data import get_form_matrix, prepare_player_data, read_in_all_players_gw_data, read_in_element_event_facts
+
+    return memory_report(
+        {
+            "per-gameweek players": read_in_all_players_gw_data(),
+            "element-event facts": read_in_element_event_facts(),
+            "player pool": prepare_player_data(),
+            "form matrix": get_form_matrix(),
+        }
+    )
+
+
+if __name__ == "__main__":
+    print(season_memory_report().to_string(index=False, float_format="{:.2f}".format))
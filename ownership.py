@@ -0,0 +1,110 @@
+# League-wide ownership statistics from the picks of many managers at once. Picks are kept as a sparse
+# manager x element x gameweek tensor in coordinate form (one entry per pick) and every statistic is a weighted
+# np.bincount over it, instead of a pandas merge per manager.
+import numpy as np
+import pandas as pd
+
+from storage import read_league_table
+
+PICK_COLUMNS = ["entry", "event", "element", "multiplier", "is_captain"]
+
+
+class PickTensor:
+    def __init__(self, picks_df):
+        # picks_df: one row per pick with entry, event, element, multiplier and is_captain, as written by
+        # league.py or returned by data.get_all_gw_picks_data_of_a_manager
+        manager, self.managers = pd.factorize(picks_df["entry"], sort=True)
+        event, self.events = pd.factorize(picks_df["event"], sort=True)
+        self.managers, self.events = self.managers.to_numpy(), self.events.to_numpy()
+        element = picks_df["element"].to_numpy(dtype=np.int64)
+        self.n_elements = int(element.max()) + 1 if len(element) else 0  # element ids index the columns directly
+
+        self.manager = manager.astype(np.int64)
+        self.event = event.astype(np.int64)
+        self.element = element
+        self.multiplier = picks_df["multiplier"].to_numpy(dtype=np.float64)
+        self.captain = picks_df["is_captain"].to_numpy(dtype=bool)
+
+        # managers x gameweeks: whether the manager had picks. Managers who joined late don't dilute earlier
+        # gameweeks, and have no score in them.
+        self.played = self._by_manager_event(None) > 0
+        self.active = self.played.sum(axis=0)
+
+    @classmethod
+    def from_league(cls, league_id):
+        return cls(read_league_table(league_id, "picks", columns=PICK_COLUMNS))
+
+    def _by_event_element(self, weights):
+        # gameweeks x elements sum of weights over all managers
+        cells = self.event * self.n_elements + self.element
+        totals = np.bincount(cells, weights=weights, minlength=len(self.events) * self.n_elements)
+        return totals.reshape(len(self.events), self.n_elements)
+
+    def _by_manager_event(self, weights):
+        cells = self.manager * len(self.events) + self.event
+        totals = np.bincount(cells, weights=weights, minlength=len(self.managers) * len(self.events))
+        return totals.reshape(len(self.managers), len(self.events))
+
+    def _per_active(self, totals):
+        return totals / np.maximum(self.active, 1)[:, None]
+
+    def ownership(self):
+        # Share of managers with the player in their 15, per gameweek
+        return self._per_active(self._by_event_element(None))
+
+    def effective_ownership(self):
+        # Average multiplier: starters count 1, captains 2 (3 with triple captain), bench 0
+        return self._per_active(self._by_event_element(self.multiplier))
+
+    def captaincy_share(self):
+        return self._per_active(self._by_event_element(self.captain.astype(np.float64)))
+
+    def template_overlap(self):
+        # managers x gameweeks: average ownership of each manager's 15, i.e. how close the squad is to the
+        # league template (1 when everyone owns exactly this squad)
+        ownership = self.ownership()
+        picks_per_squad = self._by_manager_event(None)
+        overlap = self._by_manager_event(ownership[self.event, self.element])
+        return overlap / np.maximum(picks_per_squad, 1)
+
+    def points(self, points):
+        # managers x gameweeks points scored, from a gameweeks x elements points matrix (see points_matrix)
+        return self._by_manager_event(self.multiplier * points[self.event, self.element])
+
+    def rank_swing(self, points):
+        # managers x gameweeks points gained on the league average: own points minus the EO-weighted points, NaN
+        # for gameweeks the manager had no picks in. Also returns the gameweeks x elements points of the field,
+        # for the per-player exposure of a manager.
+        field = self.effective_ownership() * points
+        swing = self.points(points) - field.sum(axis=1)[None, :]
+        return np.where(self.played, swing, np.nan), field
+
+    def exposure(self, entry):
+        # gameweeks x elements: the manager's multiplier minus the league's effective ownership. Positive when a
+        # player's points gain the manager ground on the league, negative when they lose it. NaN in gameweeks the
+        # manager had no picks in.
+        m = np.searchsorted(self.managers, entry)
+        if m == len(self.managers) or self.managers[m] != entry:
+            raise KeyError(f"Manager {entry} has no picks")
+        own = self.manager == m
+        held = np.zeros((len(self.events), self.n_elements))
+        held[self.event[own], self.element[own]] = self.multiplier[own]
+        exposure = held - self.effective_ownership()
+        exposure[~self.played[m]] = np.nan
+        return exposure
+
+    def frame(self, matrix, value_name):
+        # Long frame of the non-zero cells of a gameweeks x elements matrix
+        event, element = np.nonzero(matrix)
+        return pd.DataFrame({"event": self.events[event], "element": element, value_name: matrix[event, element]})
+
+
+def points_matrix(stats_df, events, n_elements):
+    # gameweeks x elements total points from the per-gameweek player table; double gameweeks are summed
+    event = np.searchsorted(events, stats_df["round"].to_numpy())
+    element = stats_df["element"].to_numpy(dtype=np.int64)
+    known = (event < len(events)) & (element < n_elements)
+    known[known] &= events[event[known]] == stats_df["round"].to_numpy()[known]
+    cells = event[known] * n_elements + element[known]
+    weights = stats_df["total_points"].to_numpy(dtype=np.float64)[known]
+    return np.bincount(cells, weights=weights, minlength=len(events) * n_elements).reshape(len(events), n_elements)
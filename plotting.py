@@ -5,9 +5,10 @@ import altair as alt
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
 import streamlit as st
 
+from data import get_bootstrap
+
 # def plot_points_per_event(fpl_history):
 #     df = pd.DataFrame(fpl_history["current"])
 #     # df['points'] = np.where(df['points'] == 0, df['points'].expanding().mean(), df['points'])
@@ -56,9 +57,7 @@ import streamlit as st
 
 def plot_points_per_event(fpl_history):
     df = pd.DataFrame(fpl_history["current"])
-    events_url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    events_data = requests.get(events_url).json()
-    events_df = pd.DataFrame(events_data["events"])
+    events_df = get_bootstrap().events
     chips_df = pd.DataFrame(fpl_history["chips"])
 
     # Create a line plot for points per gameweek
@@ -237,19 +236,9 @@ def plot_captain_points(df):
     return fig
 
 
-def player_form_guide(df):
-    df = df.sort_values("round")
-
-    # Calculate the rolling average of points scored for each player on a 5-gameweek interval
-    form_df = pd.DataFrame()
-    for n in df["full_name"].unique():
-        df_p = df[df["full_name"] == n]
-        df_p["form_guide"] = df_p.groupby("second_name")["total_points"].rolling(window=5, min_periods=3).mean().values
-        form_df = pd.concat([df_p, form_df])
-
-    # st.write(form_df['form_guide'])
-
-    # Plot the form guide for each player using Plotly
+def player_form_guide(form, elements, window=5):
+    # Slice the selected players out of the precomputed form matrix (see data.get_form_matrix)
+    form_df = form.frame(elements, window=window)
     last_gameweek = form_df["round"].max()
 
     # Plot the form guide for each player using Plotly
@@ -258,7 +247,11 @@ def player_form_guide(df):
         x="round",
         y="form_guide",
         color="second_name",
-        title="Player form guide from last season - moving avg of points scored (5 gw window)",
+        title=(
+            "Player form guide - exponentially weighted avg of points scored"
+            if window == "ewm"
+            else f"Player form guide - moving avg of points scored ({window} gw window)"
+        ),
     )
     fig.update_layout(
         xaxis_title="Gameweek",
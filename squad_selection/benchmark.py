@@ -0,0 +1,82 @@
+# Model build vs solve time of the squad optimizer on a synthetic, season-sized player pool, and the run time of
+# an 8 gameweek transfer plan.
+# Run with: python -m squad_selection.benchmark [planner]
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from squad_selection.model import PlayerArrays, build_model
+from squad_selection.optimiztion import POSITION_TEAM_LIMITS, SQUAD_SIZE, SquadOptimizer
+from squad_selection.planner import plan_transfers
+from squad_selection.pruning import prune_candidates
+from squad_selection.solvers import solve_model
+from squad_selection.synthetic import synthetic_players
+
+
+def time_model(df, budgets, repeats):
+    build_times, solve_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        players = PlayerArrays(df)
+        prob, _ = build_model(
+            players,
+            counts=SQUAD_SIZE,
+            budgets=budgets,
+            max_per_team=3,
+            position_team_limits=POSITION_TEAM_LIMITS,
+        )
+        build_times.append(time.perf_counter() - start)
+
+        solve_times.append(solve_model(prob).solve_time)
+    return np.median(build_times), np.median(solve_times)
+
+
+def main(repeats=5):
+    df = synthetic_players()
+    budgets = {"Goalkeeper": 9, "Defender": 27, "Midfielder": 39, "Forward": 26}
+
+    start = time.perf_counter()
+    pruned_df, removed = prune_candidates(
+        df, counts=SQUAD_SIZE, max_per_team=3, position_team_limits=POSITION_TEAM_LIMITS
+    )
+    prune_time = time.perf_counter() - start
+
+    print(f"players: {len(df)}, repeats: {repeats}")
+    for label, pool in [("full pool", df), ("pruned pool", pruned_df)]:
+        build_time, solve_time = time_model(pool, budgets, repeats)
+        print(f"{label} ({len(pool)} players)")
+        print(f"  model build: median {build_time * 1000:.1f} ms")
+        print(f"  solve:       median {solve_time * 1000:.1f} ms")
+    print(f"pruning removed {removed} players in {prune_time * 1000:.1f} ms")
+
+
+def planner_main(n_players=400, horizon=8, window=3, seeds=(0, 3, 4)):
+    # Synthetic expected points: each player's rating scaled to points, with independent noise per gameweek
+    budgets = {"Goalkeeper": 9, "Defender": 27, "Midfielder": 39, "Forward": 26}
+    print(f"players: {n_players}, horizon: {horizon}, window: {window}")
+    for seed in seeds:
+        df = synthetic_players(n_players, seed=seed)
+        rng = np.random.default_rng(seed + 1)
+        noise = rng.uniform(0.5, 1.5, size=(len(df), horizon))
+        expected = pd.DataFrame(np.clip(df["rating"].to_numpy()[:, None] / 40 * noise, 0, None), index=df.index)
+        squad_df = SquadOptimizer(df).solve(budgets)
+        squad = df.loc[squad_df.index, "id"].tolist()
+
+        start = time.perf_counter()
+        _, _, summary = plan_transfers(
+            df, squad, round(100 - squad_df["start_cost"].sum(), 1), 1, expected, horizon=horizon, window=window
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"seed {seed}: {elapsed:.1f} s, slowest window {summary['solve_time'].max():.1f} s, "
+            f"net expected points {summary['net_points'].sum():.1f}"
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["planner"]:
+        planner_main()
+    else:
+        main()
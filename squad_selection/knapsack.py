@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def cost_units(cost):
+    # Prices move in steps of 0.1m, so they are exact integers in tenths
+    return np.rint(np.asarray(cost, dtype=float) * 10).astype(np.int64)
+
+
+def solve_cardinality_knapsack(rating, cost, count, budget, groups=None, forced=()):
+    # Exact best pick of exactly `count` players with total cost <= budget, at most one per group
+    # (groups=None: no group limit), by dynamic programming over (players picked, cost in tenths).
+    # Players in `forced` are always picked. Returns the picked indices, or None if no pick is feasible.
+    rating = np.asarray(rating, dtype=float)
+    weights = cost_units(cost)
+    capacity = int(np.floor(budget * 10 + 1e-6))
+    groups = np.arange(len(rating)) if groups is None else np.asarray(groups)
+
+    forced = list(dict.fromkeys(forced))
+    if len(forced) > count or len(set(groups[forced])) < len(forced):
+        return None
+    count -= len(forced)
+    capacity -= int(weights[forced].sum())
+    if capacity < 0:
+        return None
+
+    # Forced players fill their group
+    available = ~np.isin(groups, groups[forced]) if forced else np.ones(len(rating), dtype=bool)
+
+    dp = np.full((count + 1, capacity + 1), -np.inf)
+    dp[0, 0] = 0.0
+    choices = []
+    for group in np.unique(groups[available]):
+        new = dp.copy()
+        choice = np.full(dp.shape, -1, dtype=np.int64)
+        for i in np.flatnonzero(available & (groups == group)):
+            w = weights[i]
+            if w > capacity or count == 0:
+                continue
+            # Picking i on top of a state of the previous groups; comparing against `dp`, not `new`,
+            # keeps the group to at most one pick
+            candidate = dp[:-1, : capacity + 1 - w] + rating[i]
+            target = new[1:, w:]
+            better = candidate > target
+            target[better] = candidate[better]
+            choice[1:, w:][better] = i
+        dp = new
+        choices.append(choice)
+
+    c = int(np.argmax(dp[count]))
+    if np.isneginf(dp[count, c]):
+        return None
+
+    picked = list(forced)
+    j = count
+    for choice in reversed(choices):
+        i = choice[j, c]
+        if i >= 0:
+            picked.append(int(i))
+            j -= 1
+            c -= weights[i]
+    return picked
@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+from pulp import LpAffineExpression, LpMaximize, LpProblem, LpVariable
+
+from squad_selection.rating import POSITIONS
+
+OUTPUT_COLUMNS = [
+    "full_name",
+    "pos",
+    "team_name",
+    "start_cost",
+    "avg_fixture_difficulty_first_5_gwks",
+    "selected_by_percent",
+]
+
+# Starting XI: 11 players with (min, max) starters per position
+STARTERS = 11
+FORMATION = {"Goalkeeper": (1, 1), "Defender": (3, 5), "Midfielder": (2, 5), "Forward": (1, 3)}
+
+# Share of a player's score counted for the vice-captain, the bench goalkeeper and the outfield substitutes in bench
+# order, as cover for starters that don't play
+VICE_CAPTAIN_WEIGHT = 0.1
+BENCH_GK_WEIGHT = 0.05
+BENCH_WEIGHTS = (0.3, 0.15, 0.05)
+
+
+def group_indices(codes, n_groups):
+    # Row indices of every group in one argsort, instead of re-filtering the frame once per group
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(n_groups + 1))
+    return [order[bounds[g] : bounds[g + 1]] for g in range(n_groups)]
+
+
+class PlayerArrays:
+    # The columns the optimizer needs as NumPy vectors, with rows grouped by position and team up front.
+    # Slotted: these arrays are its whole state, no per-instance __dict__.
+    __slots__ = (
+        "df",
+        "ids",
+        "rating",
+        "cost",
+        "position",
+        "teams",
+        "team",
+        "web_names",
+        "by_position",
+        "by_team",
+        "_row_of_id",
+    )
+
+    def __init__(self, df):
+        self.df = df
+        self.ids = df["id"].to_numpy()
+        self.rating = df["rating"].to_numpy(dtype=float)
+        self.cost = df["start_cost"].to_numpy(dtype=float)
+        self.position = pd.Categorical(df["singular_name"], categories=POSITIONS).codes.astype(np.int64)
+        team_codes, self.teams = pd.factorize(df["team"])
+        self.team = team_codes.astype(np.int64)
+        self.web_names = df["web_name"].to_numpy()
+        self.by_position = dict(zip(POSITIONS, group_indices(self.position, len(POSITIONS))))
+        self.by_team = group_indices(self.team, len(self.teams))
+        self._row_of_id = {player_id: row for row, player_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_of(self, players):
+        # Players can be given by element id or by web_name; returns the matching rows of each requested player
+        rows = []
+        for player in players or []:
+            if isinstance(player, str):
+                rows.append(np.flatnonzero(self.web_names == player))
+            elif player in self._row_of_id:
+                rows.append(np.array([self._row_of_id[player]]))
+            else:
+                rows.append(np.array([], dtype=np.int64))
+        return rows
+
+    def frame(self, rows, columns=OUTPUT_COLUMNS):
+        return self.df.iloc[np.sort(rows)][columns]
+
+
+def _expression(x, rows, coefficients=None):
+    if coefficients is None:
+        return LpAffineExpression([(x[i], 1) for i in rows])
+    return LpAffineExpression([(x[i], coefficients[i]) for i in rows])
+
+
+def build_model(
+    players,
+    counts,
+    budgets=None,
+    total_budget=None,
+    max_per_team=None,
+    position_team_limits=None,
+    include=None,
+    exclude=None,
+    lineup=False,
+    name="SquadSelection",
+):
+    # Squad selection model over `players` (a PlayerArrays):
+    #   counts               {position: number of players to pick}
+    #   budgets              {position: cost cap} (optional)
+    #   total_budget         cost cap over the whole selection (optional)
+    #   max_per_team         cap per team over the whole selection (optional)
+    #   position_team_limits {position: cap per team within that position} (optional)
+    #   include / exclude    lists of row-index arrays; one row of each include group is forced in, exclude rows out
+    #   lineup               also pick the XI, captain, vice-captain and bench order (full squads only)
+    # Returns the problem and its binary variables, one per row, named by element id. With lineup=True the
+    # variables of add_lineup come back as a third item.
+    prob = LpProblem(name, LpMaximize)
+    x = [LpVariable(f"selected_{player_id}", cat="Binary") for player_id in players.ids]
+
+    for position, count in counts.items():
+        rows = players.by_position[position]
+        prob += _expression(x, rows) == count, f"count_{position}"
+        if budgets and budgets.get(position) is not None:
+            prob += _expression(x, rows, players.cost) <= budgets[position], f"budget_{position}"
+
+        limit = (position_team_limits or {}).get(position)
+        if limit is not None:
+            position_teams = players.team[rows]
+            for t, team_rows in enumerate(group_indices(position_teams, len(players.teams))):
+                if len(team_rows) > limit:
+                    prob += _expression(x, rows[team_rows]) <= limit, f"team_{position}_{t}"
+
+    if total_budget is not None:
+        prob += _expression(x, range(len(players)), players.cost) <= total_budget, "budget"
+
+    if max_per_team is not None:
+        for t, team_rows in enumerate(players.by_team):
+            if len(team_rows) > max_per_team:
+                prob += _expression(x, team_rows) <= max_per_team, f"team_{t}"
+
+    for k, rows in enumerate(include or []):
+        if len(rows):
+            prob += _expression(x, rows) >= 1, f"include_{k}"
+
+    for rows in exclude or []:
+        for i in rows:
+            x[i].upBound = 0
+
+    if lineup:
+        variables, objective = add_lineup(prob, players, x, players.rating)
+        prob += LpAffineExpression(objective)
+        return prob, x, variables
+    prob += _expression(x, range(len(players)), players.rating)
+    return prob, x
+
+
+def add_lineup(prob, players, squad, score, suffix="", bench_order=True):
+    # Starting XI in a legal formation, captain (scores twice), vice-captain and bench order for the 15 players
+    # picked by the `squad` variables. Bench players and the vice-captain count for a share of their score.
+    # With bench_order=False only the XI and captain are modelled and every outfield substitute counts for the
+    # average bench share: a much smaller model, for gameweeks whose team sheet is only looked ahead to.
+    # Returns the new variables and the objective terms; suffix keeps names unique when called once per gameweek.
+    rows = range(len(players))
+    start = [LpVariable(f"start{suffix}_{player_id}", cat="Binary") for player_id in players.ids]
+    captain = [LpVariable(f"captain{suffix}_{player_id}", cat="Binary") for player_id in players.ids]
+    vice = [LpVariable(f"vice{suffix}_{player_id}", cat="Binary") for player_id in players.ids] if bench_order else []
+    goalkeepers = players.by_position["Goalkeeper"]
+    outfield = np.sort(np.concatenate([players.by_position[position] for position in POSITIONS[1:]]))
+    bench = [
+        {i: LpVariable(f"bench{suffix}_{k + 1}_{players.ids[i]}", cat="Binary") for i in outfield}
+        for k in range(len(BENCH_WEIGHTS) if bench_order else 0)
+    ]
+
+    for i in goalkeepers:
+        prob += start[i] <= squad[i], f"lineup{suffix}_{players.ids[i]}"
+    for i in outfield:
+        if bench_order:
+            # An outfield player in the squad either starts or takes exactly one bench slot
+            slots = LpAffineExpression([(start[i], 1)] + [(slot[i], 1) for slot in bench])
+            prob += slots == squad[i], f"lineup{suffix}_{players.ids[i]}"
+        else:
+            prob += start[i] <= squad[i], f"lineup{suffix}_{players.ids[i]}"
+    for i in rows:
+        armband = captain[i] + vice[i] if bench_order else captain[i]
+        prob += armband <= start[i], f"armband{suffix}_{players.ids[i]}"
+
+    prob += _expression(start, rows) == STARTERS, f"starters{suffix}"
+    for position, (low, high) in FORMATION.items():
+        starters = _expression(start, players.by_position[position])
+        prob += starters >= low, f"formation_min{suffix}_{position}"
+        prob += starters <= high, f"formation_max{suffix}_{position}"
+    prob += _expression(captain, rows) == 1, f"captain{suffix}"
+    if bench_order:
+        prob += _expression(vice, rows) == 1, f"vice_captain{suffix}"
+    for k, slot in enumerate(bench):
+        prob += LpAffineExpression([(var, 1) for var in slot.values()]) == 1, f"bench{suffix}_{k + 1}"
+
+    # One term per variable: LpAffineExpression keeps the last coefficient of a repeated variable
+    if bench_order:
+        objective = [(start[i], score[i]) for i in outfield]
+    else:
+        bench_weight = np.mean(BENCH_WEIGHTS)
+        objective = [(start[i], (1 - bench_weight) * score[i]) for i in outfield]
+        objective += [(squad[i], bench_weight * score[i]) for i in outfield]
+    objective += [(start[i], (1 - BENCH_GK_WEIGHT) * score[i]) for i in goalkeepers]
+    objective += [(squad[i], BENCH_GK_WEIGHT * score[i]) for i in goalkeepers]
+    objective += [(captain[i], score[i]) for i in rows]
+    objective += [(var, VICE_CAPTAIN_WEIGHT * score[i]) for i, var in enumerate(vice)]
+    for weight, slot in zip(BENCH_WEIGHTS, bench):
+        objective += [(var, weight * score[i]) for i, var in slot.items()]
+    return {"start": start, "captain": captain, "vice_captain": vice, "bench": bench}, objective
+
+
+def selected_rows(x):
+    return np.array([i for i, var in enumerate(x) if var.value() is not None and var.value() > 0.5], dtype=np.int64)
+
+
+def lineup_frame(players, x, lineup, columns=OUTPUT_COLUMNS):
+    # The picked squad with its team sheet: squad_position follows the FPL picks numbering (1-11 starters by
+    # position, 12 the bench goalkeeper, 13-15 the outfield bench in order)
+    rows = np.sort(selected_rows(x))
+    squad_position = np.zeros(len(players), dtype=np.int64)
+    starters = selected_rows(lineup["start"])
+    starters = starters[np.lexsort((-players.rating[starters], players.position[starters]))]
+    squad_position[starters] = np.arange(1, len(starters) + 1)
+    squad_position[np.setdiff1d(rows[players.position[rows] == 0], starters)] = STARTERS + 1
+    for k, slot in enumerate(lineup["bench"]):
+        for i, var in slot.items():
+            if var.value() is not None and var.value() > 0.5:
+                squad_position[i] = STARTERS + 2 + k
+
+    frame = players.frame(rows, columns)
+    return frame.assign(
+        squad_position=squad_position[rows],
+        captain=np.isin(rows, selected_rows(lineup["captain"])),
+        vice_captain=np.isin(rows, selected_rows(lineup["vice_captain"])),
+    )
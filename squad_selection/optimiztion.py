@@ -1,333 +1,427 @@
-from pulp import LpMaximize, LpProblem, LpVariable, lpSum, value
+import threading
 
+import numpy as np
+from pulp import LpAffineExpression
 
-# Define the composite score function with weights for each position and column
-def calculate_player_rating(row):
-    if row["singular_name"] == "Forward":
-        return (
-            (row["total_points"])
-            + (3.0 * row["expected_goal_involvements_per_90"])
-            + (2.5 * row["penalties_order"])
-            + (2.0 * row["starts"])
-            + (1.5 * row["bonus"])
-            + (1.2 * row["bps"])
-            + (1.1 * row["direct_freekicks_order"])
-            + (0.9 * row["influence"])
-            + (0.7 * row["threat"])
-            - (7.5 * row["avg_fixture_difficulty_first_5_gwks"])
-        )
-    elif row["singular_name"] == "Midfielder":
-        return (
-            (row["total_points"])
-            + (3.0 * row["expected_goal_involvements_per_90"])
-            + (2.5 * row["penalties_order"])
-            + (2.0 * row["starts"])
-            + (1.5 * row["bonus"])
-            + (1.2 * row["bps"])
-            + (1.1 * row["direct_freekicks_order"])
-            + (0.9 * row["influence"])
-            + -(7.5 * row["avg_fixture_difficulty_first_5_gwks"])
-        )
-    elif row["singular_name"] == "Defender":
-        return (
-            (row["total_points"])
-            + (3.0 * row["expected_goal_involvements_per_90"])
-            + (2.5 * row["penalties_order"])
-            + (2.0 * row["starts"])
-            + (1.5 * row["bonus"])
-            + (1.2 * row["bps"])
-            + (3 * row["clean_sheets"])
-            + (1.1 * row["direct_freekicks_order"])
-            - (7.5 * row["avg_fixture_difficulty_first_5_gwks"])
-        )
-    elif row["singular_name"] == "Goalkeeper":
-        return (
-            (row["total_points"])
-            + (2.0 * row["starts"])
-            + (1.3 * row["saves_per_90"])
-            + (1.5 * row["bonus"])
-            + (1.2 * row["bps"])
-            + (5 * row["clean_sheets"])
-            - (7.5 * row["avg_fixture_difficulty_first_5_gwks"])
-        )
-    else:
-        return 0
-
+from squad_selection.knapsack import solve_cardinality_knapsack
+from squad_selection.model import PlayerArrays, build_model, lineup_frame, selected_rows
+from squad_selection.pruning import prune_candidates
+from squad_selection.rating import rate_players
+from squad_selection.solution_cache import solution_cache, table_fingerprint
+from squad_selection.solvers import default_config, solve_model
 
-def squad_selection_forwards(df, total_cost, include_players=None, exclude_players=None):
-    df = df[df["singular_name"] == "Forward"]
-    if total_cost < (df["start_cost"].min() * 3):
-        total_cost = df["start_cost"].min() * 3
-        include_players = None
+# Number of players per position in a 15 man squad
+SQUAD_SIZE = {"Goalkeeper": 2, "Defender": 5, "Midfielder": 5, "Forward": 3}
 
-    # Create the linear programming problem
-    prob = LpProblem("PlayerSelection", LpMaximize)
+# At most one player per team within these positions, as the per-position selections do
+POSITION_TEAM_LIMITS = {"Goalkeeper": 1, "Defender": 1, "Midfielder": 1}
 
-    # Decision variables
-    selected = LpVariable.dicts("selected", df["web_name"], cat="Binary")
 
-    # Additional decision variable for average_fixture_difficulty
-    # avg_fixture_difficulty = LpVariable("avg_fixture_difficulty")
-
-    # Objective function
-    prob += lpSum(selected[player] * df.loc[df.index[i], "rating"] for i, player in enumerate(df["web_name"]))
-
-    # # Additional objective term for minimizing avg_fixture_difficulty
-    # prob += -1 * avg_fixture_difficulty
-
-    # Constraints
-    prob += lpSum(selected[player] for player in df["web_name"]) == 3
-    prob += (
-        lpSum(selected[player] * df.loc[df.index[i], "start_cost"] for i, player in enumerate(df["web_name"]))
-        <= total_cost
+# Composite score of a single player; the weights per position live in rating_weights.json.
+# Rate whole frames with rate_players instead, it scores all players in one matrix product.
+def calculate_player_rating(row):
+    return rate_players(row.to_frame().T)[0]
+
+
+def _squad_selection_position(
+    df, position, total_cost, include_players, exclude_players, failure_message, backend="knapsack", solver=None
+):
+    # Fingerprint the whole table, so the four positions share one cache snapshot
+    fingerprint = table_fingerprint(df)
+    df = df[df["singular_name"] == position]
+    return solution_cache.get_or_solve(
+        fingerprint,
+        "position",
+        lambda: _solve_position(
+            df, position, total_cost, include_players, exclude_players, failure_message, backend, solver
+        ),
+        position=position,
+        total_cost=float(total_cost),
+        include_players=include_players,
+        exclude_players=exclude_players,
+        backend=backend,
+        solver=(solver or default_config).params(),
     )
 
-    # Include specified players (if any)
-    if include_players:
-        prob += lpSum(selected[player] for player in include_players) == len(include_players)
-
-    # Exclude specified players (if any)
-    if exclude_players:
-        prob += lpSum(selected[player] for player in exclude_players) == 0
-
-    # Solve the problem
-
-    prob.solve()
 
-    # Retrieve the solution
-    status = prob.status
-    if status == -1:
-        print(f"Failed!!.. exactly 3 forwards must be selected... set budget accordingly")
-        return []
-    total_points = value(prob.objective)
-    selected_players = [player for player in df["web_name"] if selected[player].value() == 1]
-    selected_players_df = df[df["web_name"].isin(selected_players)][
-        ["full_name", "pos", "team_name", "start_cost", "avg_fixture_difficulty_first_5_gwks", "selected_by_percent"]
-    ]
-    # selected_players_df.rename(columns={"name":"team"},inplace= True)
-    return selected_players_df
-
-
-def squad_selection_midfield(df, total_cost, include_players=None, exclude_players=None):
-    df = df[df["singular_name"] == "Midfielder"]
-    if total_cost < (df["start_cost"].min() * 5):
-        total_cost = df["start_cost"].min() * 5
+def _solve_position(df, position, total_cost, include_players, exclude_players, failure_message, backend, solver):
+    count = SQUAD_SIZE[position]
+    if total_cost < (df["start_cost"].min() * count):
+        total_cost = df["start_cost"].min() * count
         include_players = None
-    # Create the linear programming problem
-    prob = LpProblem("PlayerSelection", LpMaximize)
-
-    # Decision variables
-    selected = LpVariable.dicts("selected", df["web_name"], cat="Binary")
-
-    # Additional decision variables for team count
-    team_count = LpVariable.dicts("team_count", set(df["team"]), lowBound=0, upBound=1, cat="Integer")
-
-    # Objective function
-    prob += lpSum(selected[player] * df.loc[df.index[i], "rating"] for i, player in enumerate(df["web_name"]))
 
-    # Constraints
-    prob += lpSum(selected[player] for player in df["web_name"]) == 5
-    prob += (
-        lpSum(selected[player] * df.loc[df.index[i], "start_cost"] for i, player in enumerate(df["web_name"]))
-        <= total_cost
+    # Players that can't be in the optimum never reach the model; the squad frame's attrs["pruned"] says how many
+    df, removed = prune_candidates(
+        df,
+        counts={position: count},
+        position_team_limits=POSITION_TEAM_LIMITS,
+        include_players=include_players,
+        exclude_players=exclude_players,
+    )
+    players = PlayerArrays(df)
+    include = players.rows_of(include_players)
+
+    # The knapsack forces single players in; a web_name shared by several players needs the MILP
+    if backend == "knapsack" and all(len(rows) <= 1 for rows in include):
+        limit = POSITION_TEAM_LIMITS.get(position)
+        picked = solve_cardinality_knapsack(
+            players.rating,
+            players.cost,
+            count,
+            total_cost,
+            groups=players.team if limit == 1 else None,
+            forced=[rows[0] for rows in include if len(rows)],
+        )
+        if picked is None:
+            print(failure_message)
+            return []
+        return _with_pruned(players.frame(np.array(picked)), removed)
+
+    prob, selected = build_model(
+        players,
+        counts={position: count},
+        budgets={position: total_cost},
+        position_team_limits=POSITION_TEAM_LIMITS,
+        include=include,
+        exclude=players.rows_of(exclude_players),
+        name="PlayerSelection",
     )
 
-    # Constraint: No more than 2 players from the same team
-    for team in set(df["team"]):
-        prob += lpSum(selected[player] for player in df[df["team"] == team]["web_name"]) <= team_count[team]
-
-    # Include specified players (if any)
-    if include_players:
-        prob += lpSum(selected[player] for player in include_players) == len(include_players)
-
-    # Exclude specified players (if any)
-    if exclude_players:
-        prob += lpSum(selected[player] for player in exclude_players) == 0
     # Solve the problem
-    prob.solve()
+    result = solve_model(prob, solver)
 
     # Retrieve the solution
-    status = prob.status
-    if status == -1:
-        print(f"Failed!!.. exactly 5 midfielders must be selected... set budget accordingly")
+    if not result.has_solution:
+        print(failure_message)
         return []
-    total_points = value(prob.objective)
-    selected_players = [player for player in df["web_name"] if selected[player].value() == 1]
-    selected_players_df = df[df["web_name"].isin(selected_players)][
-        ["full_name", "pos", "team_name", "start_cost", "avg_fixture_difficulty_first_5_gwks", "selected_by_percent"]
-    ]
-    # selected_players_df.rename(columns={"name": "team"}, inplace=True)
-    return selected_players_df
-
-
-def squad_selection_defence(df, total_cost, include_players=None, exclude_players=None):
-    df = df[df["singular_name"] == "Defender"]
-    if total_cost < (df["start_cost"].min() * 5):
-        total_cost = df["start_cost"].min() * 5
-        include_players = None
-    # Create the linear programming problem
-    prob = LpProblem("PlayerSelection", LpMaximize)
-
-    # Decision variables
-    selected = LpVariable.dicts("selected", df["web_name"], cat="Binary")
-
-    # Additional decision variables for team count
-    team_count = LpVariable.dicts("team_count", set(df["team"]), lowBound=0, upBound=1, cat="Integer")
-
-    # Objective function
-    prob += lpSum(selected[player] * df.loc[df.index[i], "rating"] for i, player in enumerate(df["web_name"]))
-
-    # Constraints
-    prob += lpSum(selected[player] for player in df["web_name"]) == 5
-    prob += (
-        lpSum(selected[player] * df.loc[df.index[i], "start_cost"] for i, player in enumerate(df["web_name"]))
-        <= total_cost
+    return _with_pruned(players.frame(selected_rows(selected)), removed)
+
+
+def _with_pruned(squad_df, removed):
+    # Record how many candidates pruning removed before the squad was solved for
+    squad_df.attrs["pruned"] = removed
+    return squad_df
+
+
+def squad_selection_forwards(
+    df, total_cost, include_players=None, exclude_players=None, backend="knapsack", solver=None
+):
+    return _squad_selection_position(
+        df,
+        "Forward",
+        total_cost,
+        include_players,
+        exclude_players,
+        "Failed!!.. exactly 3 forwards must be selected... set budget accordingly",
+        backend,
+        solver,
     )
 
-    # Constraint: No more than 2 players from the same team
-    for team in set(df["team"]):
-        prob += lpSum(selected[player] for player in df[df["team"] == team]["web_name"]) <= team_count[team]
-
-    # Include specified players (if any)
-    if include_players:
-        prob += lpSum(selected[player] for player in include_players) == len(include_players)
 
-    # Exclude specified players (if any)
-    if exclude_players:
-        prob += lpSum(selected[player] for player in exclude_players) == 0
+def squad_selection_midfield(
+    df, total_cost, include_players=None, exclude_players=None, backend="knapsack", solver=None
+):
+    return _squad_selection_position(
+        df,
+        "Midfielder",
+        total_cost,
+        include_players,
+        exclude_players,
+        "Failed!!.. exactly 5 midfielders must be selected... set budget accordingly",
+        backend,
+        solver,
+    )
 
-    # Solve the problem
-    prob.solve()
 
-    # Retrieve the solution
-    status = prob.status
-    if status == -1:
-        print(f"Failed!!.. exactly 5 defenders must be selected... set budget accordingly")
-        return []
-    total_points = value(prob.objective)
-    selected_players = [player for player in df["web_name"] if selected[player].value() == 1]
-    selected_players_df = df[df["web_name"].isin(selected_players)][
-        ["full_name", "pos", "team_name", "start_cost", "avg_fixture_difficulty_first_5_gwks", "selected_by_percent"]
-    ]
-    # selected_players_df.rename(columns={"name": "team"}, inplace=True)
-    return selected_players_df
-
-
-def squad_selection_gk(df, total_cost, include_players=None, exclude_players=None):
-    df = df[df["singular_name"] == "Goalkeeper"]
-    if total_cost < (df["start_cost"].min() * 2):
-        total_cost = df["start_cost"].min() * 2
-        include_players = None
-    # df.rename(columns={"name": "team"}, inplace=True)
-    # Create the linear programming problem
-    prob = LpProblem("PlayerSelection", LpMaximize)
+def squad_selection_defence(
+    df, total_cost, include_players=None, exclude_players=None, backend="knapsack", solver=None
+):
+    return _squad_selection_position(
+        df,
+        "Defender",
+        total_cost,
+        include_players,
+        exclude_players,
+        "Failed!!.. exactly 5 defenders must be selected... set budget accordingly",
+        backend,
+        solver,
+    )
 
-    # Decision variables
-    selected = LpVariable.dicts("selected", df["web_name"], cat="Binary")
 
-    # Additional decision variables for team count
-    team_count = LpVariable.dicts("team_count", set(df["team"]), lowBound=0, upBound=1, cat="Integer")
+def squad_selection_gk(df, total_cost, include_players=None, exclude_players=None, backend="knapsack", solver=None):
+    return _squad_selection_position(
+        df,
+        "Goalkeeper",
+        total_cost,
+        include_players,
+        exclude_players,
+        "Failed!!.. exactly 2 goalkeeper must be selected... set budget accordingly",
+        backend,
+        solver,
+    )
 
-    # Objective function
-    prob += lpSum(selected[player] * df.loc[df.index[i], "rating"] for i, player in enumerate(df["web_name"]))
 
-    # Constraints
-    prob += lpSum(selected[player] for player in df["web_name"]) == 2
-    prob += (
-        lpSum(selected[player] * df.loc[df.index[i], "start_cost"] for i, player in enumerate(df["web_name"]))
-        <= total_cost
+def select_squad(df, include_players=None, exclude_players=None, solver=None):
+    # Best 15 man squad for a total budget of 100, without per-position budgets
+    fingerprint = table_fingerprint(df)
+    df = df[df["singular_name"].isin(list(SQUAD_SIZE))]
+    return solution_cache.get_or_solve(
+        fingerprint,
+        "select_squad",
+        lambda: _solve_select_squad(df, include_players, exclude_players, solver),
+        include_players=include_players,
+        exclude_players=exclude_players,
+        solver=(solver or default_config).params(),
     )
 
-    # Constraint: No more than 2 players from the same team
-    for team in set(df["team"]):
-        prob += lpSum(selected[player] for player in df[df["team"] == team]["web_name"]) <= team_count[team]
-
-    # Include specified players (if any)
-    if include_players:
-        prob += lpSum(selected[player] for player in include_players) == len(include_players)
 
-    # Exclude specified players (if any)
-    if exclude_players:
-        prob += lpSum(selected[player] for player in exclude_players) == 0
+def _solve_select_squad(df, include_players, exclude_players, solver):
+    df, removed = prune_candidates(
+        df, counts=SQUAD_SIZE, max_per_team=3, include_players=include_players, exclude_players=exclude_players
+    )
+    players = PlayerArrays(df)
+    prob, selected = build_model(
+        players,
+        counts=SQUAD_SIZE,
+        total_budget=100,
+        max_per_team=3,
+        include=players.rows_of(include_players),
+        exclude=players.rows_of(exclude_players),
+    )
 
-    # Solve the problem
-    prob.solve()
+    result = solve_model(prob, solver)
 
     # Retrieve the solution
-    status = prob.status
-    if status == -1:
-        print(f"Failed!!.. exactly 2 goalkeeper must be selected... set budget accordingly")
-        return []
-    total_points = value(prob.objective)
-    selected_players = [player for player in df["web_name"] if selected[player].value() == 1]
-    selected_players_df = df[df["web_name"].isin(selected_players)][
-        ["full_name", "pos", "team_name", "start_cost", "avg_fixture_difficulty_first_5_gwks", "selected_by_percent"]
-    ]
-    return selected_players_df
-
-
-def select_squad(df, include_players=None, exclude_players=None):
-    # Filter players by position
-    goalkeepers = df[df["singular_name"] == "Goalkeeper"]
-    defenders = df[df["singular_name"] == "Defender"]
-    midfielders = df[df["singular_name"] == "Midfielder"]
-    forwards = df[df["singular_name"] == "Forward"]
-
-    # Create the linear programming problem
-    prob = LpProblem("SquadSelection", LpMaximize)
-
-    # Decision variables
-    selected = LpVariable.dicts("selected", df["web_name"], cat="Binary")
-
-    # Additional decision variables for position count and team count
-    position_count = {
-        "Goalkeeper": LpVariable("goalkeeper_count", lowBound=0, upBound=2, cat="Integer"),
-        "Defender": LpVariable("defender_count", lowBound=0, upBound=5, cat="Integer"),
-        "Midfielder": LpVariable("midfielder_count", lowBound=0, upBound=5, cat="Integer"),
-        "Forward": LpVariable("forward_count", lowBound=0, upBound=3, cat="Integer"),
-    }
-
-    team_count = LpVariable.dicts("team_count", set(df["team"]), lowBound=0, upBound=3, cat="Integer")
-
-    # Objective function
-    prob += lpSum(selected[player] * df.loc[df.index[i], "rating"] for i, player in enumerate(df["web_name"]))
-
-    # Constraints
-    prob += lpSum(selected[player] for player in df["web_name"]) == 15
-    prob += (
-        lpSum(selected[player] * df.loc[df.index[i], "start_cost"] for i, player in enumerate(df["web_name"])) <= 100
-    )
-
-    # Position count constraints
-    for position, count_var in position_count.items():
-        players = df[df["singular_name"] == position]["web_name"]
-        prob += lpSum(selected[player] for player in players) == count_var
+    selected_players_df = _with_pruned(players.frame(selected_rows(selected)), removed)
+    return result.status, result.objective, selected_players_df
+
+
+class SquadOptimizer:
+    # Full squad model built once per player snapshot. Each solve only edits the model: includes and excludes
+    # fix variable bounds, budgets change the right-hand side of the budget rows, and CBC is warm started from
+    # the previous solution. last_result holds the SolveResult of the latest solve.
+    # With lineup=True the same solve also picks the starting XI, captain, vice-captain and bench order, and
+    # squads come back as a team sheet (see model.lineup_frame).
+    # With prune=True the model only holds the players prune_candidates keeps, which is what keeps the lineup model
+    # interactive (~0.8 s against ~3 s a solve on 700 players). Pruning stays exact with the lineup: a dominator can
+    # take over a dominated player's role, as every role scores a player's rating with a non-negative weight. The
+    # shared model answers every solve whose includes and excludes still let pruning drop all the players it left
+    # out (see _fits_pool); only other choices get a model pruned for them. top_k runs on the full pool.
+    # pruned is the number of players pruning left out of the shared model, and last_result.pruned the number
+    # left out of the model the latest solve ran on.
+
+    def __init__(self, df, max_per_team=3, position_team_limits=POSITION_TEAM_LIMITS, lineup=False, prune=False):
+        self.fingerprint = table_fingerprint(df)
+        df = df[df["singular_name"].isin(list(SQUAD_SIZE))]
+        self._params = {"max_per_team": max_per_team, "position_team_limits": position_team_limits, "lineup": lineup}
+        self._df = df
+        self._prune = prune
+        self._full = None
+        self.pruned = None
+        if prune:
+            df, self.pruned = self._pruned()
+        self.players = PlayerArrays(df)
+        model = build_model(
+            self.players,
+            counts=SQUAD_SIZE,
+            budgets={position: 100.0 for position in SQUAD_SIZE},
+            max_per_team=max_per_team,
+            position_team_limits=position_team_limits,
+            lineup=lineup,
+        )
+        self.prob, self.selected = model[:2]
+        self.lineup = model[2] if lineup else None
+        self._include_constraints = []
+        self._lock = threading.Lock()  # shared between Streamlit sessions
+        self.last_result = None
+
+    def _pruned(self, include_players=None, exclude_players=None):
+        return prune_candidates(
+            self._df,
+            counts=SQUAD_SIZE,
+            max_per_team=self._params["max_per_team"],
+            position_team_limits=self._params["position_team_limits"],
+            include_players=include_players,
+            exclude_players=exclude_players,
+        )
 
-    # Team count constraints
-    for team in set(df["team"]):
-        prob += lpSum(selected[player] for player in df[df["team"] == team]["web_name"]) <= team_count[team]
+    def _fits_pool(self, pool):
+        # The shared model answers exactly when the pool pruned for a solve's includes and excludes lies inside it:
+        # then no included player is missing, and every excluded player left a stand-in for the players it dominated
+        return bool(np.isin(pool["id"], self.players.ids).all())
+
+    def _optimizer_for(self, df):
+        return SquadOptimizer(
+            df,
+            max_per_team=self._params["max_per_team"],
+            position_team_limits=self._params["position_team_limits"],
+            lineup=self._params["lineup"],
+        )
 
-    # Additional constraint for total cost of forward players
-    # prob += (
-    #     lpSum(selected[player] * df.loc[df.index[i], "start_cost"] for i, player in enumerate(forwards["web_name"]))
-    #     <= 26 * position_count["Forward"]
-    # )
+    def _set_budgets(self, budgets, include):
+        players = self.players
+        for position, count in SQUAD_SIZE.items():
+            rows = players.by_position[position]
+            total_cost = float(budgets[position])
+            min_cost = players.cost[rows].min() * count
+            if total_cost < min_cost:
+                # Budget can't buy the position at all: use the cheapest possible budget and drop its includes
+                total_cost = min_cost
+                include = [group for group in include if not set(group) & set(rows)]
+            self.prob.constraints[f"budget_{position}"].changeRHS(total_cost)
+        return include
+
+    def _set_bounds(self, include, exclude):
+        # A player both included and excluded stays out, as in prune_candidates; fixing both bounds would leave
+        # CBC with a variable it rejects
+        excluded = np.concatenate([np.asarray(rows, dtype=np.int64) for rows in exclude] + [np.array([], np.int64)])
+        include = [np.setdiff1d(rows, excluded) for rows in include]
+        for var in self.selected:
+            var.lowBound, var.upBound = 0, 1
+        for name in self._include_constraints:
+            del self.prob.constraints[name]
+        self._include_constraints = []
+
+        for k, rows in enumerate(include):
+            if len(rows) == 1:
+                self.selected[rows[0]].lowBound = 1
+            elif len(rows) > 1:
+                # A web_name shared by several players: one of them has to be picked
+                name = f"include_{k}"
+                self.prob += LpAffineExpression([(self.selected[i], 1) for i in rows]) >= 1, name
+                self._include_constraints.append(name)
+        for rows in exclude:
+            for i in rows:
+                self.selected[i].upBound = 0
+
+    def solve(self, budgets, include_players=None, exclude_players=None, solver=None):
+        # Inputs already solved on this snapshot are answered from the solution cache
+        budgets = {position: float(budgets[position]) for position in SQUAD_SIZE}
+        return solution_cache.get_or_solve(
+            self.fingerprint,
+            "full_squad",
+            lambda: self._solve(budgets, include_players, exclude_players, solver),
+            budgets=budgets,
+            include_players=include_players,
+            exclude_players=exclude_players,
+            solver=(solver or default_config).params(),
+            prune=self._prune,
+            **self._params,
+        )
 
-    # Include specified players (if any)
-    if include_players:
-        prob += lpSum(selected[player] for player in include_players) == len(include_players)
+    def _solve(self, budgets, include_players, exclude_players, solver):
+        if self._prune and (include_players or exclude_players):
+            pool, removed = self._pruned(include_players, exclude_players)
+            if not self._fits_pool(pool):
+                # The shared pool lacks an included player or the stand-in for an excluded one: solve a model
+                # pruned for these choices instead
+                optimizer = self._optimizer_for(pool)
+                squad_df = optimizer._solve(budgets, include_players, exclude_players, solver)
+                self.last_result = optimizer.last_result
+                self.last_result.pruned = removed
+                return squad_df
+        with self._lock:
+            include = self._set_budgets(budgets, self.players.rows_of(include_players))
+            self._set_bounds(include, self.players.rows_of(exclude_players))
+
+            self.last_result = self._solve_model(solver)
+
+            # Retrieve the solution
+            if not self.last_result.has_solution:
+                print("Failed!!.. no legal squad fits the budgets, includes and excludes... set them accordingly")
+                return []
+            return self._squad_frame()
+
+    def _solve_model(self, solver):
+        result = solve_model(self.prob, solver, warm_start=True)
+        result.pruned = self.pruned
+        return result
+
+    def _squad_frame(self):
+        if self.lineup is not None:
+            return lineup_frame(self.players, self.selected, self.lineup)
+        return self.players.frame(selected_rows(self.selected))
+
+    def top_k(self, budgets, k, min_difference=1, include_players=None, exclude_players=None, solver=None):
+        # The k best distinct squads, best first; each differs from every earlier one in at least
+        # min_difference players
+        budgets = {position: float(budgets[position]) for position in SQUAD_SIZE}
+        return solution_cache.get_or_solve(
+            self.fingerprint,
+            "top_k",
+            lambda: self._top_k(budgets, k, min_difference, include_players, exclude_players, solver),
+            budgets=budgets,
+            k=k,
+            min_difference=min_difference,
+            include_players=include_players,
+            exclude_players=exclude_players,
+            solver=(solver or default_config).params(),
+            **self._params,
+        )
 
-    # Exclude specified players (if any)
-    if exclude_players:
-        prob += lpSum(selected[player] for player in exclude_players) == 0
+    def _top_k(self, budgets, k, min_difference, include_players, exclude_players, solver):
+        if self._prune:
+            # The runners-up can hold dominated players, so they come from a model of the whole pool
+            with self._lock:
+                if self._full is None:
+                    self._full = self._optimizer_for(self._df)
+            squads = self._full._top_k(budgets, k, min_difference, include_players, exclude_players, solver)
+            self.last_result = self._full.last_result
+            return squads
+        squad_size = sum(SQUAD_SIZE.values())
+        squads = []
+        cuts = []
+        with self._lock:
+            include = self._set_budgets(budgets, self.players.rows_of(include_players))
+            self._set_bounds(include, self.players.rows_of(exclude_players))
+            try:
+                for _ in range(k):
+                    self.last_result = self._solve_model(solver)
+                    if not self.last_result.has_solution:
+                        break
+                    rows = selected_rows(self.selected)
+                    squads.append(self._squad_frame())
+
+                    # Exclusion cut: the next squad keeps at most squad_size - min_difference of these players
+                    name = f"diversity_{len(cuts)}"
+                    squad = LpAffineExpression([(self.selected[i], 1) for i in rows])
+                    self.prob += squad <= squad_size - min_difference, name
+                    cuts.append(name)
+            finally:
+                # Leave the model as it was for the next request
+                for name in cuts:
+                    del self.prob.constraints[name]
+        return squads
+
+
+def squad_selection_top_k(df, budgets, k=5, min_difference=1, include_players=None, exclude_players=None, solver=None):
+    # The k best distinct squads for one set of budgets, from a single model
+    optimizer = SquadOptimizer(df)
+    return optimizer.top_k(
+        budgets,
+        k,
+        min_difference=min_difference,
+        include_players=include_players,
+        exclude_players=exclude_players,
+        solver=solver,
+    )
 
-    prob.solve()
 
-    # Retrieve the solution
-    status = prob.status
-    total_points = value(prob.objective)
-    selected_players = [player for player in df["web_name"] if selected[player].value() == 1]
-    selected_players_df = df[df["web_name"].isin(selected_players)][
-        ["full_name", "pos", "team_name", "start_cost", "avg_fixture_difficulty_first_5_gwks", "selected_by_percent"]
-    ]
-    return status, total_points, selected_players_df
+def squad_selection_full(
+    df,
+    budgets,
+    include_players=None,
+    exclude_players=None,
+    max_per_team=3,
+    position_team_limits=POSITION_TEAM_LIMITS,
+    lineup=False,
+    solver=None,
+):
+    # Select the full 15 man squad in one solve: per-position budgets, the club limit across positions
+    # and the include/exclude lists all go into the same model. Keep a SquadOptimizer around instead when
+    # solving repeatedly on the same players. The optimizer prunes the pool itself, so the solution cache is keyed
+    # on the table as given, the same for every include/exclude list.
+    optimizer = SquadOptimizer(
+        df, max_per_team=max_per_team, position_team_limits=position_team_limits, lineup=lineup, prune=True
+    )
+    return optimizer.solve(budgets, include_players=include_players, exclude_players=exclude_players, solver=solver)
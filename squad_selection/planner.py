@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from pulp import LpAffineExpression, LpMaximize, LpProblem, LpVariable
+
+from squad_selection.model import PlayerArrays, add_lineup, lineup_frame
+from squad_selection.optimiztion import SQUAD_SIZE
+from squad_selection.pruning import prune_candidates
+from squad_selection.rating import POSITIONS, rate_players, rating_features, weight_matrix
+from squad_selection.solvers import SolverConfig, solve_model
+
+FIXTURE_FEATURE = "avg_fixture_difficulty_first_5_gwks"
+
+HIT_COST = 4  # points per transfer beyond the free ones
+MAX_FREE_TRANSFERS = 5
+PLAN_GAP_REL = 0.01  # a plan is a forecast; proving the last 1% of expected points isn't worth the solve time
+
+
+def expected_points(df, difficulty_matrix, fixture_counts=None, events=None, weights="default"):
+    # players x gameweeks matrix of expected points. Each gameweek rates the player with that gameweek's fixture
+    # difficulty in place of the 5 gameweek average, scales the rating to points with the pool's points_per_game,
+    # and multiplies by the number of fixtures (0 in a blank, 2 in a double gameweek).
+    events = list(difficulty_matrix.columns) if events is None else list(events)
+    difficulty = difficulty_matrix.reindex(index=df["team"], columns=events).to_numpy(dtype=float)
+    if fixture_counts is None:
+        counts = (~np.isnan(difficulty)).astype(float)
+    else:
+        counts = fixture_counts.reindex(index=df["team"], columns=events).fillna(0).to_numpy(dtype=float)
+
+    rating = df["rating"].to_numpy(dtype=float) if "rating" in df.columns else rate_players(df, weights)
+    positions = pd.Categorical(df["singular_name"], categories=POSITIONS).codes
+    fixture_weight = weight_matrix(weights)[:, rating_features().index(FIXTURE_FEATURE)][positions]
+    average = pd.to_numeric(df[FIXTURE_FEATURE], errors="coerce").fillna(0).to_numpy(dtype=float)
+    per_gameweek = (rating - fixture_weight * average)[:, None] + fixture_weight[:, None] * np.nan_to_num(difficulty)
+
+    scale = 1.0
+    if "points_per_game" in df.columns:
+        points_per_game = pd.to_numeric(df["points_per_game"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        rated = (rating > 0) & (points_per_game > 0)
+        if rated.any():
+            scale = points_per_game[rated].sum() / rating[rated].sum()
+    return pd.DataFrame(np.clip(per_gameweek, 0, None) * scale * counts, index=df.index, columns=events)
+
+
+def _candidate_pool(df, expected, squad, pool_size, max_per_team):
+    # Per position the best players over the horizon and the best value for money, plus the current squad.
+    # Players dominated on expected points over the horizon (see prune_candidates) are dropped first, so the
+    # pool isn't spent on them. Keeps each window model small; a player outside the pool is never worth a
+    # transfer in practice.
+    total = expected.sum(axis=1)
+    pruned, _ = prune_candidates(
+        df.assign(rating=total), counts=SQUAD_SIZE, max_per_team=max_per_team, include_players=squad
+    )
+    df, total = df.loc[pruned.index], total[pruned.index]
+    value = total / df["start_cost"]
+    keep = df["id"].isin(squad)
+    for position in POSITIONS:
+        in_position = df["singular_name"] == position
+        keep |= df.index.isin(total[in_position].nlargest(pool_size).index)
+        keep |= df.index.isin(value[in_position].nlargest(pool_size // 2).index)
+    return df[keep]
+
+
+def _window_model(players, expected, in_squad, bank, free_transfers, sell_price, hit_cost, max_per_team):
+    # Transfers and team sheet for every gameweek of one window. expected is players x window gameweeks,
+    # in_squad the squad going into the window.
+    n, window = expected.shape
+    rows = range(n)
+    squad_size = sum(SQUAD_SIZE.values())
+    prob = LpProblem("TransferPlan", LpMaximize)
+    squad, buy, sell, lineups, hits, free = [], [], [], [], [], [free_transfers]
+    objective = []
+    bank_change = []
+    for t in range(window):
+        x = [LpVariable(f"squad_{t}_{i}", cat="Binary") for i in rows]
+        b = [LpVariable(f"buy_{t}_{i}", cat="Binary") for i in rows]
+        s = [LpVariable(f"sell_{t}_{i}", cat="Binary") for i in rows]
+        h = LpVariable(f"hits_{t}", lowBound=0, cat="Integer")
+
+        for i in rows:
+            if t == 0:
+                # Only players outside the squad can be bought, only squad players sold
+                b[i].upBound, s[i].upBound = 1 - in_squad[i], in_squad[i]
+                prob += x[i] == in_squad[i] + b[i] - s[i], f"flow_{t}_{i}"
+            else:
+                prob += x[i] == squad[t - 1][i] + b[i] - s[i], f"flow_{t}_{i}"
+                prob += b[i] + s[i] <= 1, f"buy_or_sell_{t}_{i}"
+        for position, count in SQUAD_SIZE.items():
+            position_rows = players.by_position[position]
+            prob += LpAffineExpression([(x[i], 1) for i in position_rows]) == count, f"count_{t}_{position}"
+        for k, team_rows in enumerate(players.by_team):
+            if len(team_rows) > max_per_team:
+                prob += LpAffineExpression([(x[i], 1) for i in team_rows]) <= max_per_team, f"team_{t}_{k}"
+
+        # Money in the bank can't go negative at any point of the window
+        bank_change += [(s[i], sell_price[i]) for i in rows] + [(b[i], -players.cost[i]) for i in rows]
+        prob += LpAffineExpression(bank_change) >= -bank, f"bank_{t}"
+
+        # Transfers beyond the free ones cost hit_cost each; unused free transfers roll over up to the cap
+        transfers = LpAffineExpression([(b[i], 1) for i in rows])
+        if t + 1 < window:
+            # free - transfers split into unused free transfers and hits, never both: otherwise paying a hit
+            # would buy an extra free transfer for later
+            unused = LpVariable(f"unused_{t}", lowBound=0, upBound=MAX_FREE_TRANSFERS, cat="Integer")
+            rollover = LpVariable(f"rollover_{t}", cat="Binary")
+            prob += unused - h == free[t] - transfers, f"hits_{t}"
+            prob += unused <= MAX_FREE_TRANSFERS * rollover, f"unused_{t}"
+            prob += h <= squad_size * (1 - rollover), f"no_rollover_{t}"
+            f = LpVariable(f"free_{t + 1}", lowBound=1, upBound=MAX_FREE_TRANSFERS, cat="Integer")
+            prob += f <= unused + 1, f"free_{t + 1}"
+            free.append(f)
+        else:
+            prob += h >= transfers - free[t], f"hits_{t}"
+
+        # Only the first gameweek's team sheet is committed; later ones just value the squad
+        lineup, points = add_lineup(prob, players, x, expected[:, t], suffix=f"_{t}", bench_order=t == 0)
+        objective += points
+        objective.append((h, -hit_cost))
+
+        squad.append(x)
+        buy.append(b)
+        sell.append(s)
+        lineups.append(lineup)
+        hits.append(h)
+
+    prob += LpAffineExpression(objective)
+    return prob, squad, buy, sell, lineups, hits
+
+
+def _chosen(variables):
+    return np.array([v.value() is not None and v.value() > 0.5 for v in variables])
+
+
+def plan_transfers(
+    df,
+    squad,
+    bank,
+    free_transfers,
+    expected,
+    horizon=8,
+    window=3,
+    hit_cost=HIT_COST,
+    max_per_team=3,
+    pool_size=10,
+    selling_prices=None,
+    solver=None,
+):
+    # Transfer plan for the next `horizon` gameweeks by rolling horizon: optimise transfers and team sheet over
+    # a `window` gameweek model, commit only its first gameweek, roll forward and repeat. Each solve stays small
+    # no matter how long the horizon is.
+    #   squad           element ids of the current 15 man squad
+    #   bank            money in the bank, in millions
+    #   expected        players x gameweeks expected points (see expected_points), indexed like df
+    #   selling_prices  {element id: selling price} of the current squad; defaults to the current price
+    #   pool_size       candidates per position (see _candidate_pool); the main driver of solve time
+    # Returns the transfers, the squad of every gameweek and a per gameweek summary.
+    df = df[df["singular_name"].isin(list(SQUAD_SIZE))]
+    missing = set(squad) - set(df["id"])
+    if len(squad) != sum(SQUAD_SIZE.values()) or missing:
+        print(f"Failed!!.. the current squad must be 15 known players, unknown ids: {sorted(missing)}")
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    events = list(expected.columns)[:horizon]
+    expected = expected.loc[df.index, events]
+    df = _candidate_pool(df, expected, squad, pool_size, max_per_team)
+    players = PlayerArrays(df)
+    scores = expected.loc[df.index].to_numpy(dtype=float)
+
+    sell_price = players.cost.copy()
+    for player_id, price in (selling_prices or {}).items():
+        for rows in players.rows_of([player_id]):
+            sell_price[rows] = price
+
+    solver = solver or SolverConfig(gap_rel=PLAN_GAP_REL)
+    in_squad = np.isin(players.ids, list(squad)).astype(int)
+    transfers, squads, summary = [], [], []
+    for k, event in enumerate(events):
+        prob, squad_vars, buy, sell, lineups, hits = _window_model(
+            players,
+            scores[:, k : k + window],
+            in_squad,
+            bank,
+            free_transfers,
+            sell_price,
+            hit_cost,
+            max_per_team,
+        )
+        result = solve_model(prob, solver)
+        if not result.has_solution:
+            print(f"Failed!!.. no legal transfers for gameweek {event}")
+            break
+
+        # Commit the first gameweek of the window
+        bought, sold = np.flatnonzero(_chosen(buy[0])), np.flatnonzero(_chosen(sell[0]))
+        n_hits = int(round(hits[0].value() or 0))
+        bank = round(bank + sell_price[sold].sum() - players.cost[bought].sum(), 1)
+        for direction, rows in [("out", sold), ("in", bought)]:
+            for i in rows:
+                transfers.append(
+                    {"event": event, "direction": direction, "id": players.ids[i], "web_name": players.web_names[i]}
+                )
+
+        in_squad = _chosen(squad_vars[0]).astype(int)
+        starters, captained = _chosen(lineups[0]["start"]), _chosen(lineups[0]["captain"])
+        gameweek_squad = lineup_frame(
+            players, squad_vars[0], lineups[0], columns=["id", "web_name", "singular_name", "team", "start_cost"]
+        )
+        squads.append(gameweek_squad.assign(event=event, expected_points=scores[np.flatnonzero(in_squad), k]))
+
+        points = (scores[:, k] * (starters + captained)).sum()
+        summary.append(
+            {
+                "event": event,
+                "transfers": len(bought),
+                "free_transfers": free_transfers,
+                "hits": n_hits,
+                "expected_points": points,
+                "net_points": points - hit_cost * n_hits,
+                "bank": bank,
+                "solve_time": result.solve_time,
+            }
+        )
+        free_transfers = min(MAX_FREE_TRANSFERS, free_transfers - len(bought) + n_hits + 1)
+
+    transfers_df = pd.DataFrame(transfers, columns=["event", "direction", "id", "web_name"])
+    squads_df = pd.concat(squads, ignore_index=True) if squads else pd.DataFrame()
+    return transfers_df, squads_df, pd.DataFrame(summary)
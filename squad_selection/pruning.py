@@ -0,0 +1,76 @@
+import numpy as np
+
+from squad_selection.model import PlayerArrays
+
+
+def _dominators(rating, cost):
+    # dominated_by[j, i]: player i is at least as good and at least as cheap as player j. Exact ties are broken by
+    # row order, so two identical players never rule each other out.
+    n = len(rating)
+    better_or_equal = (rating[None, :] >= rating[:, None]) & (cost[None, :] <= cost[:, None])
+    strictly = (rating[None, :] > rating[:, None]) | (cost[None, :] < cost[:, None])
+    earlier = np.arange(n)[None, :] < np.arange(n)[:, None]
+    return better_or_equal & (strictly | earlier)
+
+
+def prune_candidates(
+    df,
+    counts,
+    squad_size=None,
+    max_per_team=None,
+    position_team_limits=None,
+    include_players=None,
+    exclude_players=None,
+):
+    # Drop players that can never be needed in an optimal squad. In an optimal squad containing player j, some
+    # dominator of j (rated at least as high, costs no more, same position) could take j's place unless it is
+    # already picked or its team is full. j is dropped only when that can't block all of its dominators:
+    #   - the other count - 1 picks of the position each use up a dominator or block at most one team
+    #   - at most (squad_size - 1) // max_per_team other teams can be at the club limit
+    # The optimum is unchanged; only budget-independent facts are used, so one pruned pool serves any budget.
+    # Excluded players are removed and never count as dominators, included players are always kept.
+    # Returns the pruned frame and the number of dominated players removed.
+    players = PlayerArrays(df)
+    squad_size = squad_size or sum(counts.values())
+    position_team_limits = position_team_limits or {}
+    club_blocked = (squad_size - 1) // max_per_team if max_per_team else 0
+
+    excluded = np.zeros(len(players), dtype=bool)
+    for rows in players.rows_of(exclude_players):
+        excluded[rows] = True
+    keep = np.zeros(len(players), dtype=bool)
+    for rows in players.rows_of(include_players):
+        keep[rows] = True
+
+    prunable = np.zeros(len(players), dtype=bool)
+    for position, count in counts.items():
+        rows = players.by_position[position]
+        rows = rows[~excluded[rows]]
+        if len(rows) <= count:
+            continue
+
+        dominated_by = _dominators(players.rating[rows], players.cost[rows])
+        team = players.team[rows]
+        team_onehot = np.zeros((len(rows), len(players.teams)), dtype=np.int64)
+        team_onehot[np.arange(len(rows)), team] = 1
+        per_team = dominated_by.astype(np.int64) @ team_onehot  # dominators of each player, per team
+
+        limit = position_team_limits.get(position)
+        if limit is None:
+            # Each of the other picks can use up one dominator, and a full club blocks all of its dominators
+            ordered = -np.sort(-per_team, axis=1)
+            unblocked = ordered[:, club_blocked:].sum(axis=1)
+            prunable[rows] = unblocked >= count
+        else:
+            # Count teams instead: every other pick can shut out at most one team
+            own_team = per_team[np.arange(len(rows)), team]
+            other_teams = (per_team > 0).sum(axis=1) - (own_team > 0)
+            blocked = (count - 1) + club_blocked
+            prunable[rows] = other_teams > blocked
+            if limit == 1:
+                # A dominator from the player's own team can always replace it one for one
+                prunable[rows] |= own_team > 0
+
+    removed = prunable & ~keep
+    pruned_df = df[~(removed | excluded)]
+    return pruned_df, int((removed & ~excluded).sum())
@@ -0,0 +1,76 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+POSITIONS = ["Goalkeeper", "Defender", "Midfielder", "Forward"]
+
+WEIGHTS_PATH = os.environ.get(
+    "FPL_RATING_WEIGHTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rating_weights.json")
+)
+
+
+@lru_cache(maxsize=None)
+def _load_config(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def rating_features(path=WEIGHTS_PATH):
+    # Every stat used by at least one weight set, in a fixed order shared by the feature and weight matrices
+    config = _load_config(path)
+    features = []
+    for weight_set in config.values():
+        for position_weights in weight_set.values():
+            for feature in position_weights:
+                if feature not in features:
+                    features.append(feature)
+    return features
+
+
+def weight_matrix(name="default", path=WEIGHTS_PATH):
+    # positions x features matrix of one named weight set; stats a position doesn't use have weight 0
+    weight_set = _load_config(path)[name]
+    features = rating_features(path)
+    weights = np.zeros((len(POSITIONS), len(features)))
+    for p, position in enumerate(POSITIONS):
+        for feature, weight in weight_set.get(position, {}).items():
+            weights[p, features.index(feature)] = weight
+    return weights
+
+
+def weight_set_names(path=WEIGHTS_PATH):
+    return list(_load_config(path))
+
+
+def feature_matrix(df, path=WEIGHTS_PATH):
+    # players x features matrix plus each player's position index (-1 for unknown positions).
+    # Missing stats (e.g. no penalties_order) count as 0.
+    features = rating_features(path)
+    X = np.zeros((len(df), len(features)))
+    for f, feature in enumerate(features):
+        if feature in df.columns:
+            X[:, f] = pd.to_numeric(df[feature], errors="coerce").fillna(0).to_numpy(dtype=float)
+    positions = pd.Categorical(df["singular_name"], categories=POSITIONS).codes
+    return X, positions
+
+
+def rate_players_batch(df, weight_sets=None, path=WEIGHTS_PATH):
+    # Score every player under several weight sets at once; returns a players x weight sets matrix.
+    # weight_sets can be names from the config file or positions x features arrays.
+    if weight_sets is None:
+        weight_sets = weight_set_names(path)
+    W = np.stack([weight_matrix(w, path) if isinstance(w, str) else np.asarray(w, dtype=float) for w in weight_sets])
+
+    X, positions = feature_matrix(df, path)
+    ratings = np.zeros((len(df), len(W)))
+    for p in range(len(POSITIONS)):
+        mask = positions == p
+        ratings[mask] = X[mask] @ W[:, p, :].T
+    return ratings
+
+
+def rate_players(df, weights="default", path=WEIGHTS_PATH):
+    return rate_players_batch(df, [weights], path)[:, 0]
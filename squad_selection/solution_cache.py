@@ -0,0 +1,95 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from squad_selection.model import OUTPUT_COLUMNS
+
+# Columns that decide the optimum or appear in the result
+FINGERPRINT_COLUMNS = ["id", "web_name", "singular_name", "team", "start_cost", "rating"] + OUTPUT_COLUMNS
+
+
+def table_fingerprint(df):
+    # Content hash of the rated player table; a new data snapshot or a new weight set gives a new fingerprint
+    columns = [c for c in dict.fromkeys(FINGERPRINT_COLUMNS) if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes() + ",".join(columns).encode()).hexdigest()
+
+
+def _normalise(value):
+    # Hashable, order-independent form of the optimizer inputs
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalise(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted({_normalise(v) for v in value}, key=repr))
+    if isinstance(value, str) or value is None:
+        return value
+    return float(value)
+
+
+class SolutionCache:
+    # LRU cache of optimizer results, across table snapshots: tables used side by side (a new data snapshot and
+    # the last one, or two weight sets) keep their entries. Once more than max_snapshots fingerprints are in
+    # use, the entries of the least recently used one are dropped.
+
+    def __init__(self, maxsize=256, max_snapshots=4):
+        self.maxsize = maxsize
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()  # fingerprint -> keys of its entries, least recently used first
+        self._solutions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, fingerprint, name, **params):
+        return fingerprint, name, _normalise(params)
+
+    def get_or_solve(self, fingerprint, name, solve, **params):
+        key = self.key(fingerprint, name, **params)
+        with self._lock:
+            self._touch(fingerprint)
+            if key in self._solutions:
+                self._solutions.move_to_end(key)
+                self.hits += 1
+                return _copy(self._solutions[key])
+            self.misses += 1
+
+        result = solve()
+
+        with self._lock:
+            # Not stored if its snapshot was evicted while solving
+            if fingerprint in self._snapshots:
+                self._solutions[key] = _copy(result)
+                self._snapshots[fingerprint].add(key)
+                while len(self._solutions) > self.maxsize:
+                    old_key, _ = self._solutions.popitem(last=False)
+                    self._snapshots[old_key[0]].discard(old_key)
+        return result
+
+    def _touch(self, fingerprint):
+        if fingerprint in self._snapshots:
+            self._snapshots.move_to_end(fingerprint)
+            return
+        self._snapshots[fingerprint] = set()
+        while len(self._snapshots) > self.max_snapshots:
+            _, keys = self._snapshots.popitem(last=False)
+            for key in keys:
+                del self._solutions[key]
+
+    def clear(self):
+        with self._lock:
+            self._solutions.clear()
+            self._snapshots.clear()
+
+
+def _copy(result):
+    # Callers get their own frames, so sorting or adding columns can't leak into the cache
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    if isinstance(result, (tuple, list)):
+        return type(result)(_copy(r) for r in result)
+    return result
+
+
+solution_cache = SolutionCache()
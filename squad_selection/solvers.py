@@ -0,0 +1,137 @@
+import os
+import re
+import tempfile
+import time
+
+import pulp
+from pulp import LpSolution, LpSolutionIntegerFeasible, LpSolutionOptimal, value
+
+# Defaults for every optimizer solve; override per deployment through the environment
+SOLVER = os.environ.get("FPL_SOLVER", "cbc")
+TIME_LIMIT = float(os.environ.get("FPL_SOLVER_TIME_LIMIT", 10))  # seconds, bounds the tail latency of a request
+THREADS = int(os.environ.get("FPL_SOLVER_THREADS", 1))
+GAP_REL = float(os.environ.get("FPL_SOLVER_GAP", 0))  # relative MIP gap at which the search stops
+
+BACKENDS = ["cbc", "highs"]
+
+
+class SolverConfig:
+    # Which MILP solver to run and how long and hard it may search. A solve stopped by the time limit or the gap
+    # still returns its best squad; SolveResult.optimal tells the two apart.
+
+    def __init__(self, backend=SOLVER, time_limit=TIME_LIMIT, threads=THREADS, gap_rel=GAP_REL, msg=False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown solver backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.time_limit = time_limit
+        self.threads = threads
+        self.gap_rel = gap_rel
+        self.msg = msg
+
+    def params(self):
+        # Settings that can change the returned squad, for the solution cache key
+        return {"backend": self.backend, "time_limit": self.time_limit, "gap_rel": self.gap_rel}
+
+    def available_backend(self):
+        if self.backend == "highs" and not pulp.HiGHS().available():
+            print("HiGHS is not available (pip install highspy), solving with CBC instead")
+            return "cbc"
+        return self.backend
+
+    def solver(self, backend=None, warm_start=False, log_path=None):
+        if (backend or self.backend) == "highs":
+            return pulp.HiGHS(msg=self.msg, timeLimit=self.time_limit, threads=self.threads, gapRel=self.gap_rel)
+        # CBC writes its log to log_path, so node count and gap can be read back
+        return pulp.PULP_CBC_CMD(
+            msg=self.msg and log_path is None,
+            timeLimit=self.time_limit,
+            threads=self.threads,
+            gapRel=self.gap_rel,
+            warmStart=warm_start,
+            logPath=log_path,
+        )
+
+
+default_config = SolverConfig()
+
+
+class SolveResult:
+    # pruned: players dominance pruning removed before the model was built, None when the pool wasn't pruned
+
+    def __init__(self, backend, status, sol_status, objective, solve_time, nodes=None, gap=None, pruned=None):
+        self.backend = backend
+        self.status = status
+        self.sol_status = sol_status
+        self.objective = objective
+        self.solve_time = solve_time
+        self.nodes = nodes
+        self.gap = gap
+        self.pruned = pruned
+
+    @property
+    def status_name(self):
+        # From the solution status: a solve stopped by the time limit has prob.status Optimal but only a feasible
+        # squad ("Solution Found")
+        return LpSolution[self.sol_status]
+
+    @property
+    def optimal(self):
+        return self.sol_status == LpSolutionOptimal
+
+    @property
+    def has_solution(self):
+        # Also true when the time limit stopped the search after a squad was found
+        return self.sol_status in (LpSolutionOptimal, LpSolutionIntegerFeasible)
+
+    def __repr__(self):
+        return (
+            f"SolveResult(backend={self.backend!r}, status={self.status_name!r}, optimal={self.optimal}, "
+            f"objective={self.objective}, solve_time={self.solve_time:.3f}, nodes={self.nodes}, gap={self.gap}, "
+            f"pruned={self.pruned})"
+        )
+
+
+def _cbc_stats(log):
+    # Node count and final relative gap from the summary CBC prints at the end of its log
+    nodes = re.search(r"^Enumerated nodes:\s+(\d+)", log, re.MULTILINE)
+    objective = re.search(r"^Objective value:\s+(\S+)", log, re.MULTILINE)
+    bound = re.search(r"^(?:Upper|Lower) bound:\s+(\S+)", log, re.MULTILINE)
+    gap = None
+    if objective and bound:
+        objective, bound = float(objective.group(1)), float(bound.group(1))
+        gap = abs(bound - objective) / max(abs(objective), 1e-9)
+    elif objective:
+        gap = 0.0
+    return (int(nodes.group(1)) if nodes else None), gap
+
+
+def solve_model(prob, config=None, warm_start=False):
+    # Solve prob with the configured backend and report how the solve went
+    config = config or default_config
+    backend = config.available_backend()
+    log_path = None
+    if backend == "cbc":
+        fd, log_path = tempfile.mkstemp(suffix="-cbc.log")
+        os.close(fd)
+    solver = config.solver(backend, warm_start=warm_start, log_path=log_path)
+
+    start = time.perf_counter()
+    try:
+        prob.solve(solver)
+        solve_time = time.perf_counter() - start
+        if backend == "cbc":
+            with open(log_path) as f:
+                log = f.read()
+            if config.msg:
+                print(log)
+            nodes, gap = _cbc_stats(log)
+        else:
+            info = prob.solverModel.getInfo()
+            nodes, gap = int(info.mip_node_count), float(info.mip_gap)
+    finally:
+        if log_path:
+            os.remove(log_path)
+
+    has_solution = prob.sol_status in (LpSolutionOptimal, LpSolutionIntegerFeasible)
+    objective = value(prob.objective) if has_solution else None
+    return SolveResult(backend, prob.status, prob.sol_status, objective, solve_time, nodes=nodes, gap=gap)
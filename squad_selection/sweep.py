@@ -0,0 +1,112 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from squad_selection.optimiztion import POSITION_TEAM_LIMITS, SQUAD_SIZE, SquadOptimizer
+from squad_selection.pruning import prune_candidates
+
+# Default budget range (in millions) swept per position
+BUDGET_RANGES = {"Goalkeeper": (8, 12), "Defender": (20, 36), "Midfielder": (24, 50), "Forward": (14, 36)}
+
+_worker = {}
+
+
+def budget_grid(step=1.0, total_budget=100, budget_ranges=BUDGET_RANGES):
+    # Every GK/DEF/MID/FWD split on a `step` grid within budget_ranges whose total is at most total_budget
+    axes = [np.arange(low, high + step / 2, step) for low, high in (budget_ranges[p] for p in SQUAD_SIZE)]
+    return [
+        dict(zip(SQUAD_SIZE, (round(float(b), 1) for b in split)))
+        for split in itertools.product(*axes)
+        if sum(split) <= total_budget + 1e-9
+    ]
+
+
+def _effective_budgets(df, budgets):
+    # Budgets capped at the most that can be spent per position, so splits that can only produce the same squad
+    # collapse into one sub-problem. Only capped from above: below the cheapest squad, the optimizer applies its
+    # own rule (see SquadOptimizer._set_budgets), and those splits must stay separate problems.
+    effective = {}
+    for position, count in SQUAD_SIZE.items():
+        costs = np.sort(df.loc[df["singular_name"] == position, "start_cost"].to_numpy())
+        high = costs[-count:].sum()
+        effective[position] = round(float(min(budgets[position], high)), 1)
+    return tuple(effective[position] for position in SQUAD_SIZE)
+
+
+def _init_worker(df, include_players, exclude_players):
+    # Each process builds the model once and re-solves it for every split it is handed
+    _worker["df"] = df
+    _worker["optimizer"] = SquadOptimizer(df)
+    _worker["include"] = include_players
+    _worker["exclude"] = exclude_players
+
+
+def _solve_split(split):
+    df = _worker["df"]
+    squad_df = _worker["optimizer"].solve(
+        dict(zip(SQUAD_SIZE, split)),
+        include_players=_worker["include"],
+        exclude_players=_worker["exclude"],
+    )
+    if not len(squad_df):
+        return split, np.nan, np.nan, ()
+    index = squad_df.index
+    total_rating = float(df.loc[index, "rating"].sum())
+    total_cost = float(df.loc[index, "start_cost"].sum())
+    return split, total_rating, total_cost, tuple(df.loc[index, "id"])
+
+
+def pareto_frontier(results_df):
+    # Squads no other squad beats on both rating (higher) and cost (lower or equal)
+    feasible = results_df.dropna(subset=["total_rating"])
+    feasible = feasible.sort_values(["total_cost", "total_rating"], ascending=[True, False])
+    frontier = feasible[feasible["total_rating"] > feasible["total_rating"].cummax().shift(fill_value=-np.inf)]
+    return frontier.drop_duplicates(subset=["total_cost", "total_rating"]).reset_index(drop=True)
+
+
+def budget_sweep(
+    df,
+    step=1.0,
+    total_budget=100,
+    budget_ranges=BUDGET_RANGES,
+    include_players=None,
+    exclude_players=None,
+    max_workers=None,
+):
+    # Solve every budget split of the grid across a process pool.
+    # Returns all results, the rating vs cost Pareto frontier and the best split; results_df.attrs["pruned"] is the
+    # number of players pruning removed. Dominance pruning doesn't depend on the budgets, so one pruned pool serves
+    # the whole grid
+    df, removed = prune_candidates(
+        df[df["singular_name"].isin(list(SQUAD_SIZE))],
+        counts=SQUAD_SIZE,
+        max_per_team=3,
+        position_team_limits=POSITION_TEAM_LIMITS,
+        include_players=include_players,
+        exclude_players=exclude_players,
+    )
+    splits = budget_grid(step, total_budget, budget_ranges)
+    effective = [_effective_budgets(df, split) for split in splits]
+    unique_splits = list(dict.fromkeys(effective))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(unique_splits) // (max_workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(df, include_players, exclude_players)
+    ) as executor:
+        solved = {split: result for split, *result in executor.map(_solve_split, unique_splits, chunksize=chunksize)}
+
+    columns = ["total_rating", "total_cost", "players"]
+    results_df = pd.DataFrame([{**split, **dict(zip(columns, solved[key]))} for split, key in zip(splits, effective)])
+    results_df.attrs["pruned"] = removed
+    frontier_df = pareto_frontier(results_df)
+
+    feasible = results_df.dropna(subset=["total_rating"])
+    if feasible.empty:
+        return results_df, frontier_df, None
+    best = feasible.sort_values(["total_rating", "total_cost"], ascending=[False, True]).iloc[0]
+    best_split = {position: float(best[position]) for position in SQUAD_SIZE}
+    return results_df, frontier_df, best_split
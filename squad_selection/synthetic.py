@@ -0,0 +1,26 @@
+# Synthetic, season-sized player pools with the columns the optimizers read, for the benchmarks and the tests
+import numpy as np
+import pandas as pd
+
+from squad_selection.rating import POSITIONS
+
+
+def synthetic_players(n_players=700, n_teams=20, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(POSITIONS, size=n_players, p=[0.1, 0.35, 0.4, 0.15])
+    start_cost = np.round(rng.uniform(4.0, 13.0, size=n_players), 1)
+    return pd.DataFrame(
+        {
+            "id": np.arange(1, n_players + 1),
+            "web_name": [f"Player {i}" for i in range(1, n_players + 1)],
+            "full_name": [f"Player {i}" for i in range(1, n_players + 1)],
+            "singular_name": positions,
+            "pos": positions,
+            "team": rng.integers(1, n_teams + 1, size=n_players),
+            "team_name": "",
+            "start_cost": start_cost,
+            "rating": start_cost * 20 + rng.normal(0, 25, size=n_players),
+            "avg_fixture_difficulty_first_5_gwks": rng.uniform(2, 5, size=n_players),
+            "selected_by_percent": rng.uniform(0, 50, size=n_players),
+        }
+    )
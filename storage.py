@@ -0,0 +1,296 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_DIR = os.environ.get("FPL_DATA_DIR", "FPLData")
+GW_SNAPSHOT_DIR = os.path.join(DATA_DIR, "all_players_per_gw")
+LEGACY_GW_CSV = os.path.join(DATA_DIR, "all_payer_per_gw_data.csv")
+
+# Explicit schema of the per-gameweek player table. Strings that repeat on every row are stored as
+# dictionary-encoded columns and come back as pandas categoricals.
+GW_SCHEMA = pa.schema(
+    [
+        ("element", pa.int32()),
+        ("fixture", pa.int32()),
+        ("opponent_team", pa.int16()),
+        ("total_points", pa.int16()),
+        ("was_home", pa.bool_()),
+        ("kickoff_time", pa.string()),
+        ("team_h_score", pa.float32()),
+        ("team_a_score", pa.float32()),
+        ("round", pa.int16()),
+        ("minutes", pa.int16()),
+        ("goals_scored", pa.int16()),
+        ("assists", pa.int16()),
+        ("clean_sheets", pa.int16()),
+        ("goals_conceded", pa.int16()),
+        ("own_goals", pa.int16()),
+        ("penalties_saved", pa.int16()),
+        ("penalties_missed", pa.int16()),
+        ("yellow_cards", pa.int16()),
+        ("red_cards", pa.int16()),
+        ("saves", pa.int16()),
+        ("bonus", pa.int16()),
+        ("bps", pa.int16()),
+        ("influence", pa.float32()),
+        ("creativity", pa.float32()),
+        ("threat", pa.float32()),
+        ("ict_index", pa.float32()),
+        ("starts", pa.int16()),
+        ("expected_goals", pa.float32()),
+        ("expected_assists", pa.float32()),
+        ("expected_goal_involvements", pa.float32()),
+        ("expected_goals_conceded", pa.float32()),
+        ("value", pa.int16()),
+        ("transfers_balance", pa.int32()),
+        ("selected", pa.int32()),
+        ("transfers_in", pa.int32()),
+        ("transfers_out", pa.int32()),
+        ("first_name", pa.dictionary(pa.int16(), pa.string())),
+        ("second_name", pa.dictionary(pa.int16(), pa.string())),
+        ("element_type", pa.int8()),
+        ("team_code", pa.int16()),
+        ("singular_name", pa.dictionary(pa.int8(), pa.string())),
+        ("name", pa.dictionary(pa.int8(), pa.string())),
+    ]
+)
+
+
+def _to_table(df):
+    # Cast to GW_SCHEMA; columns the API adds later are kept with their inferred type, merge leftovers are dropped
+    df = df.drop(columns=[c for c in ("Unnamed: 0", "id", "id_x", "id_y", "code") if c in df.columns])
+    columns = {}
+    fields = []
+    for field in GW_SCHEMA:
+        if field.name not in df.columns:
+            continue
+        column = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(column.astype(str)).dictionary_encode().cast(field.type)
+        elif pa.types.is_string(field.type) or pa.types.is_boolean(field.type):
+            array = pa.array(column, type=field.type, from_pandas=True)
+        else:
+            numeric = pd.to_numeric(column, errors="coerce")
+            if not pa.types.is_floating(field.type):
+                numeric = numeric.fillna(0)
+            array = pa.array(numeric, from_pandas=True).cast(field.type)
+        columns[field.name] = array
+        fields.append(field)
+    for name in df.columns:
+        if name not in columns:
+            columns[name] = pa.array(df[name], from_pandas=True)
+            fields.append(pa.field(name, columns[name].type))
+    return pa.Table.from_arrays(list(columns.values()), schema=pa.schema(fields))
+
+
+def _partition_dir(root, gw):
+    return os.path.join(root, f"round={int(gw)}")
+
+
+def write_gw_round(df, gw, root=GW_SNAPSHOT_DIR):
+    # (Re)write a single round partition; written next to the old one and swapped in, so readers never see half a round.
+    # The old partition is renamed aside, not deleted, until the new one is in place: a reader caught between the two
+    # renames reads the old copy (see _partition_file).
+    table = _to_table(df.drop(columns="round"))
+    path = _partition_dir(root, gw)
+    tmp_path = path + ".tmp"
+    old_path = path + ".old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    pq.write_table(table, os.path.join(tmp_path, "part-0.parquet"))
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.isdir(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def write_gw_snapshot(df, root=GW_SNAPSHOT_DIR, final_rounds=()):
+    # Replace the whole snapshot, one partition per round. Built in a sibling directory and swapped in the way
+    # write_gw_round swaps a round, so readers see the old season or the new one, never half of one.
+    root = os.path.normpath(root)
+    tmp_root = root + ".tmp"
+    old_root = root + ".old"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+    for gw, round_df in df.groupby("round"):
+        write_gw_round(round_df, gw, root=tmp_root)
+    mark_final_rounds(final_rounds, root=tmp_root)
+    shutil.rmtree(old_root, ignore_errors=True)
+    if os.path.isdir(root):
+        os.rename(root, old_root)
+    os.rename(tmp_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+
+
+def migrate_legacy_gw_csv(path=LEGACY_GW_CSV, root=GW_SNAPSHOT_DIR):
+    # One-off migration of the snapshot older versions wrote as CSV. The CSV is renamed afterwards, so it is never
+    # migrated again. Returns whether there was a CSV to migrate.
+    if not os.path.exists(path):
+        return False
+    write_gw_snapshot(pd.read_csv(path), root=root)
+    os.replace(path, path + ".migrated")
+    return True
+
+
+def _live_root(root):
+    # The snapshot directory, or its old copy while write_gw_snapshot swaps a new one in
+    root = os.path.normpath(root)
+    if not os.path.isdir(root) and os.path.isdir(root + ".old"):
+        return root + ".old"
+    return root
+
+
+def _manifest_path(root):
+    return os.path.join(root, "_manifest.json")
+
+
+def final_rounds(root=GW_SNAPSHOT_DIR):
+    # Rounds persisted after FPL finished checking their data; these are never fetched again
+    try:
+        with open(_manifest_path(_live_root(root))) as f:
+            return set(json.load(f)["final_rounds"])
+    except (OSError, ValueError, KeyError):
+        return set()
+
+
+def mark_final_rounds(rounds, root=GW_SNAPSHOT_DIR):
+    rounds = final_rounds(root) | {int(gw) for gw in rounds}
+    rounds &= set(snapshot_rounds(root))
+    tmp_path = _manifest_path(root) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"final_rounds": sorted(rounds)}, f)
+    os.replace(tmp_path, _manifest_path(root))
+
+
+def snapshot_rounds(root=GW_SNAPSHOT_DIR):
+    # Rounds that currently have a partition on disk, counting one that is being swapped (only its .old copy left)
+    root = _live_root(root)
+    if not os.path.isdir(root):
+        return []
+    partitions = [d for d in os.listdir(root) if d.startswith("round=") and not d.endswith(".tmp")]
+    return sorted({int(d.split("=", 1)[1].removesuffix(".old")) for d in partitions})
+
+
+def _partition_file(root, gw):
+    # The round's file, or the old copy while write_gw_round swaps the partition; the new one again if the swap
+    # finished in between
+    path = os.path.join(_partition_dir(root, gw), "part-0.parquet")
+    for candidate in (path, os.path.join(_partition_dir(root, gw) + ".old", "part-0.parquet"), path):
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"No partition for round {gw} in {root}")
+
+
+def read_gw_snapshot(columns=None, rounds=None, root=GW_SNAPSHOT_DIR, attempts=3):
+    # Only the requested columns and rounds are read from disk. A snapshot swapped out by write_gw_snapshot in the
+    # middle of the read is read again from the new one.
+    for attempt in range(attempts):
+        try:
+            return _read_gw_snapshot(columns, rounds, _live_root(root))
+        except FileNotFoundError:
+            if attempt == attempts - 1 or not snapshot_rounds(root):
+                raise
+
+
+def _read_gw_snapshot(columns, rounds, root):
+    available = snapshot_rounds(root)
+    if not available:
+        raise FileNotFoundError(f"No per-gameweek snapshot found in {root}")
+    rounds = available if rounds is None else [gw for gw in available if gw in set(rounds)]
+
+    read_columns = None if columns is None else [c for c in columns if c != "round"]
+    tables = []
+    for gw in rounds:
+        table = pq.read_table(_partition_file(root, gw), columns=read_columns)
+        tables.append(table.append_column("round", pa.array([gw] * table.num_rows, type=pa.int16())))
+    df = pa.concat_tables(tables, promote_options="default").to_pandas()
+
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+# Per (element, event) fact table derived from the per-gameweek snapshot, see data.build_element_event_facts
+FACTS_PATH = os.path.join(DATA_DIR, "element_event.parquet")
+
+
+def write_element_event_facts(df, path=FACTS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pq.write_table(_to_table(df), path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def read_element_event_facts(columns=None, path=FACTS_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No element-event fact table at {path}")
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+# Bulk league ingestion: one directory per league, one parquet part per table per batch of managers
+LEAGUE_DIR = os.path.join(DATA_DIR, "leagues")
+
+
+def league_dir(league_id, root=LEAGUE_DIR):
+    return os.path.join(root, str(int(league_id)))
+
+
+def _league_manifest(league_id, root=LEAGUE_DIR):
+    try:
+        with open(_manifest_path(league_dir(league_id, root))) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"entries": [], "batches": 0}
+
+
+def ingested_entries(league_id, root=LEAGUE_DIR):
+    # Managers whose data is fully written; a resumed ingestion skips them
+    return set(_league_manifest(league_id, root)["entries"])
+
+
+def next_league_batch(league_id, root=LEAGUE_DIR):
+    # Number of the next batch. Parts of a batch that never made it into the manifest (interrupted between
+    # writing and recording it) are removed, so their managers are ingested again without duplicates.
+    batches = _league_manifest(league_id, root)["batches"]
+    path = league_dir(league_id, root)
+    for name in os.listdir(path) if os.path.isdir(path) else []:
+        table_dir = os.path.join(path, name)
+        if not os.path.isdir(table_dir):
+            continue
+        for part in os.listdir(table_dir):
+            if part.startswith("part-") and (part.endswith(".tmp") or int(part[5:10]) >= batches):
+                os.remove(os.path.join(table_dir, part))
+    return batches
+
+
+def write_league_batch(league_id, batch, tables, entries, root=LEAGUE_DIR):
+    # Write one batch ({table name: frame}) as part-<batch>.parquet per table, then record its managers
+    path = league_dir(league_id, root)
+    for name, df in tables.items():
+        table_dir = os.path.join(path, name)
+        os.makedirs(table_dir, exist_ok=True)
+        part = os.path.join(table_dir, f"part-{int(batch):05d}.parquet")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), part + ".tmp")
+        os.replace(part + ".tmp", part)
+
+    manifest = _league_manifest(league_id, root)
+    manifest["entries"] += [int(entry) for entry in entries]
+    manifest["batches"] = int(batch) + 1
+    tmp_path = _manifest_path(path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _manifest_path(path))
+
+
+def read_league_table(league_id, name, columns=None, root=LEAGUE_DIR):
+    # One table ("standings", "history" or "picks") of an ingested league, only the requested columns
+    table_dir = os.path.join(league_dir(league_id, root), name)
+    parts = sorted(p for p in os.listdir(table_dir) if p.endswith(".parquet")) if os.path.isdir(table_dir) else []
+    if not parts:
+        raise FileNotFoundError(f"No {name} data ingested for league {league_id} in {root}")
+    tables = [pq.read_table(os.path.join(table_dir, part), columns=columns) for part in parts]
+    return pa.concat_tables(tables, promote_options="default").to_pandas()
@@ -0,0 +1,37 @@
+# Helpers shared by the tests: synthetic player pools and solving one problem two ways
+from squad_selection.optimiztion import (
+    SquadOptimizer,
+    squad_selection_defence,
+    squad_selection_forwards,
+    squad_selection_gk,
+    squad_selection_midfield,
+)
+from squad_selection.synthetic import synthetic_players  # noqa: F401
+
+SELECTIONS = {
+    "Goalkeeper": squad_selection_gk,
+    "Defender": squad_selection_defence,
+    "Midfielder": squad_selection_midfield,
+    "Forward": squad_selection_forwards,
+}
+
+
+def total_rating(df, squad):
+    return 0.0 if len(squad) == 0 else float(df.loc[squad.index, "rating"].sum())
+
+
+def solve_both_backends(df, position, budget, include_players=None, exclude_players=None):
+    # One position selected by the knapsack and by the MILP
+    select = SELECTIONS[position]
+    knapsack = select(df, budget, include_players, exclude_players, backend="knapsack")
+    milp = select(df, budget, include_players, exclude_players, backend="milp")
+    return knapsack, milp
+
+
+def solve_pruned_and_full(df, budgets, lineup=False, **choices):
+    # The full squad from an optimizer on the pruned pool and from one on the whole pool
+    pruned = SquadOptimizer(df, lineup=lineup, prune=True)
+    full = SquadOptimizer(df, lineup=lineup)
+    pruned_squad = pruned.solve(budgets, **choices)
+    full_squad = full.solve(budgets, **choices)
+    return pruned, pruned_squad, full, full_squad
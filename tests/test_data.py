@@ -0,0 +1,23 @@
+# Table building in data.py that needs no API access
+import numpy as np
+import pandas as pd
+
+from data import average_fixture_difficulty
+
+
+def test_fixture_window_is_each_teams_next_fixtures():
+    nan = np.nan
+    matrix = pd.DataFrame(
+        [
+            [2.0, 3.0, 4.0, 5.0],
+            [nan, 3.0, nan, 5.0],  # played in the gameweek in progress, blank in the next
+            [nan, nan, nan, nan],  # no fixtures left
+        ],
+        index=[1, 2, 3],
+        columns=[10, 11, 12, 13],
+    )
+    averages = average_fixture_difficulty(matrix, window=2)
+    assert averages.loc[1] == 2.5
+    assert averages.loc[2] == 4.0
+    assert np.isnan(averages.loc[3])
+    assert average_fixture_difficulty(matrix, window=10).loc[1] == 3.5
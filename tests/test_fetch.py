@@ -0,0 +1,131 @@
+# The fetch engine against a local stub server: retries, ETag revalidation, concurrency and connection reuse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch import element_summary_url, fetch_element_summaries, fetch_json, fetch_many
+from http_cache import ResponseCache
+
+DELAY = 0.2  # seconds per /slow/ request
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        if failures:
+            self._send(503)
+        elif self.path.startswith("/etag/"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers={"ETag": '"v1"'})
+            else:
+                self._send(200, {"version": 1}, {"ETag": '"v1"'})
+        elif self.path.startswith("/slow/"):
+            time.sleep(DELAY)
+            self._send(200, {"path": self.path})
+        elif self.path.startswith("/missing/"):
+            self._send(404)
+        else:
+            self._send(200, {"path": self.path})
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.connections = set()
+    httpd.failures = {}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path))
+
+
+def test_retries_transient_errors(server, cache):
+    server.failures["/flaky/"] = 2
+    assert fetch_json(f"{server.url}/flaky/", cache=cache, backoff=0) == {"path": "/flaky/"}
+    assert server.requests.count("/flaky/") == 3
+
+
+def test_gives_up_after_retries(server):
+    server.failures["/down/"] = 10
+    assert fetch_json(f"{server.url}/down/", cache=None, retries=2, backoff=0) is None
+    assert server.requests.count("/down/") == 3
+
+
+def test_no_retry_on_client_errors(server):
+    assert fetch_json(f"{server.url}/missing/", cache=None, backoff=0) is None
+    assert server.requests.count("/missing/") == 1
+
+
+def test_serves_fresh_cache_and_revalidates_stale(server, cache):
+    url = f"{server.url}/etag/"
+    assert fetch_json(url, cache=cache) == {"version": 1}
+    assert fetch_json(url, cache=cache) == {"version": 1}
+    assert server.requests.count("/etag/") == 1  # fresh: no request
+
+    # Stale: revalidated with the ETag, answered by a body-less 304
+    assert fetch_json(url, cache=cache, ttl=0) == {"version": 1}
+    assert server.requests.count("/etag/") == 2
+    assert cache.is_fresh(cache.get(url), 60)
+
+
+def test_stale_copy_when_upstream_is_down(server, cache):
+    url = f"{server.url}/flaky/"
+    fetch_json(url, cache=cache)
+    server.failures["/flaky/"] = 10
+    assert fetch_json(url, cache=cache, ttl=0, retries=1, backoff=0) == {"path": "/flaky/"}
+
+
+def test_fetch_many_runs_concurrently(server):
+    urls = [f"{server.url}/slow/{i}" for i in range(8)]
+    start = time.perf_counter()
+    results = fetch_many(urls, max_workers=8, cache=None)
+    elapsed = time.perf_counter() - start
+    assert list(results) == urls
+    assert all(results[url] == {"path": url[len(server.url) :]} for url in urls)
+    assert elapsed < DELAY * 4  # 8 sequential requests would take DELAY * 8
+
+
+def test_connections_reused_across_calls(server):
+    for _ in range(3):
+        fetch_many([f"{server.url}/page/{i}" for i in range(4)], max_workers=4, cache=None)
+    assert len(server.requests) == 12
+    assert len(server.connections) <= 4
+
+
+def test_element_summaries_bypass_the_cache(server, cache):
+    url = element_summary_url(1, server.url)
+    cache.put(url, {"cached": True})
+    assert fetch_element_summaries([1], base_url=server.url, cache=cache) == {1: {"cached": True}}
+    assert fetch_element_summaries([1], base_url=server.url, cache=None) == {1: {"path": "/element-summary/1/"}}
@@ -0,0 +1,50 @@
+# Vectorised form averages against pandas rolling/ewm run on each player separately
+import numpy as np
+import pandas as pd
+import pytest
+
+from form import FormMatrix, ewm_mean, rolling_mean
+
+
+@pytest.fixture
+def points():
+    # 30 players x 12 gameweeks with blank gameweeks (NaN), a player who joined late and one who never played
+    rng = np.random.default_rng(0)
+    points = rng.integers(0, 15, size=(30, 12)).astype(float)
+    points[rng.random(points.shape) < 0.2] = np.nan
+    points[1, :6] = np.nan
+    points[2] = np.nan
+    return points
+
+
+@pytest.mark.parametrize("window", [3, 5, 10])
+@pytest.mark.parametrize("min_periods", [1, 3])
+def test_rolling_mean_matches_pandas(points, window, min_periods):
+    expected = pd.DataFrame(points.T).rolling(window, min_periods=min_periods).mean().to_numpy().T
+    np.testing.assert_allclose(rolling_mean(points, window, min_periods=min_periods), expected)
+
+
+@pytest.mark.parametrize("span", [3, 5])
+def test_ewm_mean_matches_pandas(points, span):
+    expected = pd.DataFrame(points.T).ewm(span=span, adjust=True).mean().to_numpy().T
+    np.testing.assert_allclose(ewm_mean(points, span=span), expected)
+
+
+def test_form_matrix_from_facts(points):
+    elements, rounds = np.nonzero(~np.isnan(points))
+    facts = pd.DataFrame(
+        {
+            "element": elements + 1,
+            "event": rounds + 1,
+            "total_points": points[elements, rounds],
+            "second_name": [f"S{element}" for element in elements + 1],
+        }
+    )
+    form = FormMatrix.from_facts(facts)
+
+    # The player who never played has no row, the others keep their blank gameweeks
+    played = ~np.isnan(points).all(axis=1)
+    np.testing.assert_array_equal(form.elements, np.nonzero(played)[0] + 1)
+    np.testing.assert_allclose(form.form(5), rolling_mean(points[played], 5))
+    latest = form.latest("ewm")
+    np.testing.assert_allclose(latest.loc[1], ewm_mean(points[:1])[0, -1])
@@ -0,0 +1,48 @@
+# The knapsack backend of the per-position selections against the PuLP model on seeded random pools
+import numpy as np
+import pytest
+
+from helpers import SELECTIONS, solve_both_backends, synthetic_players, total_rating
+from squad_selection.optimiztion import SQUAD_SIZE
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("position", list(SELECTIONS))
+def test_same_rating_as_milp(seed, position):
+    df = synthetic_players(300, seed=seed)
+    count = SQUAD_SIZE[position]
+    for budget in [4.5 * count, 6.5 * count, 9.0 * count]:
+        knapsack, milp = solve_both_backends(df, position, budget)
+        assert len(knapsack) == len(milp)
+        assert total_rating(df, knapsack) == pytest.approx(total_rating(df, milp))
+        if len(knapsack):
+            assert knapsack.attrs["pruned"] == milp.attrs["pruned"] > 0
+
+
+@pytest.mark.parametrize("seed", [3, 4])
+@pytest.mark.parametrize("position", list(SELECTIONS))
+def test_forced_and_excluded_players(seed, position):
+    df = synthetic_players(300, seed=seed)
+    in_position = df[df["singular_name"] == position]
+    rng = np.random.default_rng(seed)
+    forced = [int(rng.choice(in_position["id"]))]
+    excluded = in_position.nlargest(2, "rating")["id"].tolist()
+    excluded = [player for player in excluded if player not in forced]
+
+    knapsack, milp = solve_both_backends(df, position, 7.0 * SQUAD_SIZE[position], forced, excluded)
+    assert len(knapsack) == len(milp) == SQUAD_SIZE[position]
+    assert total_rating(df, knapsack) == pytest.approx(total_rating(df, milp))
+    assert forced[0] in df.loc[knapsack.index, "id"].tolist()
+    assert not set(excluded) & set(df.loc[knapsack.index, "id"])
+
+
+@pytest.mark.parametrize("position", list(SELECTIONS))
+def test_infeasible_budgets(position):
+    # A forced player the budget can't pay for leaves no legal pick with either backend
+    df = synthetic_players(300, seed=5)
+    in_position = df[df["singular_name"] == position]
+    forced = [int(in_position.loc[in_position["start_cost"].idxmax(), "id"])]
+    budget = in_position["start_cost"].nsmallest(SQUAD_SIZE[position]).sum() + 0.1
+
+    knapsack, milp = solve_both_backends(df, position, budget, forced)
+    assert len(knapsack) == len(milp) == 0
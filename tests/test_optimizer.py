@@ -0,0 +1,111 @@
+# SquadOptimizer on the pruned pool against the full pool: the same best squad value, with and without the lineup
+import pytest
+
+from helpers import solve_pruned_and_full, synthetic_players
+from squad_selection.optimiztion import SquadOptimizer, squad_selection_full
+from squad_selection.solution_cache import solution_cache
+
+BUDGETS = {"Goalkeeper": 11.0, "Defender": 35.0, "Midfielder": 45.0, "Forward": 27.0}
+
+
+@pytest.fixture(autouse=True)
+def empty_solution_cache():
+    # A cached answer leaves last_result as the previous solve left it
+    solution_cache.clear()
+
+
+@pytest.mark.parametrize("lineup", [False, True])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_pruned_pool_keeps_the_optimum(seed, lineup):
+    df = synthetic_players(250, seed=seed)
+    pruned, pruned_squad, full, full_squad = solve_pruned_and_full(df, BUDGETS, lineup)
+    assert len(pruned.players) < len(full.players)
+    assert pruned.pruned == len(full.players) - len(pruned.players)
+    assert pruned.last_result.pruned == pruned.pruned and full.last_result.pruned is None
+    assert len(pruned_squad) == len(full_squad) == 15
+    assert pruned.last_result.objective == pytest.approx(full.last_result.objective)
+
+
+def test_includes_and_excludes_outside_the_pruned_pool():
+    df = synthetic_players(250, seed=0)
+    pruned = SquadOptimizer(df, prune=True)
+    # A player the pruned pool dropped, and the best rated player of each position
+    dropped = int(df.loc[~df["id"].isin(pruned.players.ids), "id"].iloc[0])
+    best = df.sort_values("rating").groupby("singular_name")["id"].last().tolist()
+
+    pruned, pruned_squad, full, full_squad = solve_pruned_and_full(
+        df, BUDGETS, False, include_players=[dropped], exclude_players=best
+    )
+    assert pruned.last_result.objective == pytest.approx(full.last_result.objective)
+    assert dropped in set(df.loc[pruned_squad.index, "id"])
+    assert not set(best) & set(df.loc[pruned_squad.index, "id"])
+
+
+def test_top_k_on_pruned_optimizer_matches_full_pool():
+    df = synthetic_players(250, seed=1)
+    pruned = SquadOptimizer(df, prune=True).top_k(BUDGETS, 3)
+    full = SquadOptimizer(df).top_k(BUDGETS, 3)
+    assert [squad["start_cost"].sum() for squad in pruned] == pytest.approx(
+        [squad["start_cost"].sum() for squad in full]
+    )
+
+
+@pytest.mark.parametrize("min_difference", [1, 3])
+def test_top_k_squads_differ_in_min_difference_players(min_difference):
+    df = synthetic_players(250, seed=1)
+    optimizer = SquadOptimizer(df)
+    squads = optimizer.top_k(BUDGETS, 4, min_difference=min_difference)
+
+    assert len(squads) == 4
+    ids = [set(df.loc[squad.index, "id"]) for squad in squads]
+    for i, earlier in enumerate(ids):
+        for later in ids[i + 1 :]:
+            assert len(later - earlier) >= min_difference
+    # Best first, and the first is the plain optimum; the cuts are gone again afterwards
+    ratings = [df.loc[squad.index, "rating"].sum() for squad in squads]
+    assert ratings == sorted(ratings, reverse=True)
+    assert set(df.loc[optimizer.solve(BUDGETS).index, "id"]) == ids[0]
+
+
+def test_squad_selection_full_reuses_the_solution_cache():
+    df = synthetic_players(250, seed=0)
+    hits = solution_cache.hits
+    first = squad_selection_full(df, BUDGETS)
+    squad_selection_full(df, BUDGETS, include_players=[int(df["id"].iloc[0])])
+    again = squad_selection_full(df, BUDGETS)
+    assert solution_cache.hits == hits + 1
+    assert again.index.tolist() == first.index.tolist()
+
+
+def test_choices_that_fit_the_pruned_pool_reuse_the_shared_model(monkeypatch):
+    df = synthetic_players(250, seed=0)
+    optimizer = SquadOptimizer(df, prune=True)
+    rebuilt = []
+    monkeypatch.setattr(optimizer, "_optimizer_for", lambda pool: rebuilt.append(pool) or SquadOptimizer(pool))
+    full = SquadOptimizer(df)
+
+    # As the app does: include a player of the pool, exclude a low rated one
+    kept = df[df["id"].isin(optimizer.players.ids)].sort_values("rating")
+    include, exclude = [int(kept["id"].iloc[-1])], [int(kept["id"].iloc[0])]
+    squad = optimizer.solve(BUDGETS, include_players=include, exclude_players=exclude)
+    full.solve(BUDGETS, include_players=include, exclude_players=exclude)
+    assert rebuilt == []
+    assert optimizer.last_result.pruned == optimizer.pruned
+    assert df.loc[squad.index, "rating"].sum() == pytest.approx(full.last_result.objective)
+
+    # Including a pruned player needs a model pruned for that choice
+    include = [int(df.loc[~df["id"].isin(optimizer.players.ids), "id"].iloc[0])]
+    squad = optimizer.solve(BUDGETS, include_players=include)
+    full.solve(BUDGETS, include_players=include)
+    assert len(rebuilt) == 1
+    assert df.loc[squad.index, "rating"].sum() == pytest.approx(full.last_result.objective)
+
+
+def test_exclude_wins_over_include_of_the_same_player():
+    df = synthetic_players(250, seed=1)
+    player = int(df.sort_values("rating")["id"].iloc[-1])
+    optimizer = SquadOptimizer(df)
+    optimizer.solve(BUDGETS)
+    squad = optimizer.solve(BUDGETS, include_players=[player], exclude_players=[player])
+    assert len(squad) == 15
+    assert player not in set(df.loc[squad.index, "id"])
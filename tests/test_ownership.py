@@ -0,0 +1,112 @@
+# PickTensor statistics against the straightforward pandas groupby/merge they replace
+import numpy as np
+import pandas as pd
+import pytest
+
+from ownership import PickTensor, points_matrix
+
+EVENTS = [3, 4, 5]
+N_ELEMENTS = 40
+
+
+def random_picks(n_managers=12, seed=0):
+    # 15 picks per manager and gameweek, the first captained. The last manager only joined in the second gameweek.
+    rng = np.random.default_rng(seed)
+    rows = []
+    for entry in range(100, 100 + n_managers):
+        for event in EVENTS:
+            if entry == 100 + n_managers - 1 and event == EVENTS[0]:
+                continue
+            elements = rng.choice(np.arange(1, N_ELEMENTS), 15, replace=False)
+            for k, element in enumerate(elements):
+                multiplier = 2 if k == 0 else (1 if k < 11 else 0)
+                rows.append((entry, event, element, multiplier, k == 0))
+    return pd.DataFrame(rows, columns=["entry", "event", "element", "multiplier", "is_captain"])
+
+
+def random_stats(seed=1):
+    # Per-fixture points; element 5 has a double gameweek in the second gameweek
+    rng = np.random.default_rng(seed)
+    rows = [(element, event, rng.integers(0, 13)) for event in EVENTS for element in range(1, N_ELEMENTS)]
+    rows.append((5, EVENTS[1], 7))
+    return pd.DataFrame(rows, columns=["element", "round", "total_points"])
+
+
+@pytest.fixture
+def tensor():
+    picks = random_picks()
+    return picks, PickTensor(picks)
+
+
+def pandas_effective_ownership(picks):
+    active = picks.groupby("event")["entry"].nunique()
+    eo = picks.groupby(["event", "element"])["multiplier"].sum()
+    return eo / active.reindex(eo.index.get_level_values("event")).to_numpy()
+
+
+def pandas_points(stats):
+    return stats.groupby(["round", "element"])["total_points"].sum().rename_axis(["event", "element"])
+
+
+def test_effective_ownership_matches_groupby(tensor):
+    picks, picks_tensor = tensor
+    expected = pandas_effective_ownership(picks)
+
+    eo = picks_tensor.frame(picks_tensor.effective_ownership(), "eo").set_index(["event", "element"])["eo"]
+    # Bench-only players have zero EO and are left out of the frame
+    pd.testing.assert_series_equal(eo.sort_index(), expected[expected > 0].sort_index(), check_names=False)
+
+
+def test_points_matrix_sums_double_gameweeks(tensor):
+    picks, picks_tensor = tensor
+    stats = random_stats()
+    points = points_matrix(stats, picks_tensor.events, picks_tensor.n_elements)
+
+    expected = pandas_points(stats)
+    for (event, element), value in expected.items():
+        assert points[np.searchsorted(picks_tensor.events, event), element] == value
+
+
+def test_rank_swing_matches_merge(tensor):
+    picks, picks_tensor = tensor
+    stats = random_stats()
+    swing, field = picks_tensor.rank_swing(points_matrix(stats, picks_tensor.events, picks_tensor.n_elements))
+
+    points = pandas_points(stats).rename("points").reset_index()
+    scored = picks.merge(points, on=["event", "element"], how="left")
+    scored["scored"] = scored["multiplier"] * scored["points"]
+    manager_points = scored.groupby(["entry", "event"])["scored"].sum()
+    eo = pandas_effective_ownership(picks).rename("eo").reset_index().merge(points, on=["event", "element"])
+    field_points = (eo["eo"] * eo["points"]).groupby(eo["event"]).sum()
+
+    expected = manager_points - field_points.reindex(manager_points.index.get_level_values("event")).to_numpy()
+    expected = expected.unstack("event").reindex(index=picks_tensor.managers, columns=picks_tensor.events)
+    np.testing.assert_allclose(swing, expected.to_numpy())
+    # The late joiner has no score before their first gameweek
+    assert np.isnan(swing[-1, 0]) and not np.isnan(swing[-1, 1:]).any()
+    np.testing.assert_allclose(field.sum(axis=1), field_points.to_numpy())
+
+
+def test_exposure_matches_merge(tensor):
+    picks, picks_tensor = tensor
+    eo = pandas_effective_ownership(picks).rename("eo").reset_index()
+
+    for entry in (100, 111):
+        own = picks[picks["entry"] == entry][["event", "element", "multiplier"]]
+        merged = eo.merge(own, on=["event", "element"], how="left").fillna({"multiplier": 0})
+        merged["exposure"] = merged["multiplier"] - merged["eo"]
+        exposure = picks_tensor.exposure(entry)
+
+        played = np.isin(picks_tensor.events, own["event"].unique())
+        assert np.isnan(exposure[~played]).all()
+        merged = merged[merged["event"].isin(picks_tensor.events[played])]
+        rows = np.searchsorted(picks_tensor.events, merged["event"].to_numpy())
+        np.testing.assert_allclose(exposure[rows, merged["element"].to_numpy()], merged["exposure"].to_numpy())
+        # Players nobody owns have no exposure
+        assert (exposure[played][:, 0] == 0).all()
+
+
+def test_exposure_of_an_unknown_manager(tensor):
+    picks, picks_tensor = tensor
+    with pytest.raises(KeyError):
+        picks_tensor.exposure(99)
@@ -0,0 +1,85 @@
+# Rolling horizon transfer planner on small synthetic pools: free transfer rollover, hits and the bank
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers import synthetic_players
+from squad_selection.optimiztion import SQUAD_SIZE
+from squad_selection.planner import MAX_FREE_TRANSFERS, plan_transfers
+
+EVENTS = [10, 11, 12, 13]
+
+
+def starting_squad(df):
+    # The cheapest legal squad: 15 players, at most 3 per team
+    squad = []
+    for position, count in SQUAD_SIZE.items():
+        in_position = df[df["singular_name"] == position].sort_values("start_cost")
+        picked = in_position.groupby("team").head(1).head(count)
+        squad += picked["id"].tolist()
+    return squad
+
+
+def expected_for(df, points):
+    # The same expected points in every gameweek
+    return pd.DataFrame(
+        np.repeat(np.asarray(points, dtype=float)[:, None], len(EVENTS), axis=1), index=df.index, columns=EVENTS
+    )
+
+
+@pytest.fixture
+def pool():
+    df = synthetic_players(120, seed=2)
+    return df, starting_squad(df)
+
+
+def test_unused_free_transfers_roll_over(pool):
+    df, squad = pool
+    # Only the current squad scores: no transfer is worth making
+    expected = expected_for(df, np.where(df["id"].isin(squad), 5.0, 0.0))
+    transfers, squads, summary = plan_transfers(df, squad, 0.0, 1, expected, horizon=4, window=2)
+
+    assert transfers.empty
+    assert summary["free_transfers"].tolist() == [1, 2, 3, 4]
+    assert summary["hits"].tolist() == [0, 0, 0, 0]
+    assert all(set(squads.loc[squads["event"] == event, "id"]) == set(squad) for event in EVENTS)
+
+
+def test_hits_only_for_transfers_beyond_the_free_ones(pool):
+    df, squad = pool
+    # Every player the squad could swap to is worth far more than a hit
+    expected = expected_for(df, np.where(df["id"].isin(squad), 1.0, 20.0))
+    transfers, squads, summary = plan_transfers(df, squad, 100.0, 1, expected, horizon=3, window=2)
+
+    assert summary["transfers"].iloc[0] > 1
+    for row in summary.itertuples():
+        assert row.hits == max(0, row.transfers - row.free_transfers)
+    # Free transfers carried into each gameweek: one more than were left unused, never raised by a hit
+    for before, after in zip(summary.itertuples(), summary.iloc[1:].itertuples()):
+        unused = max(0, before.free_transfers - before.transfers)
+        assert after.free_transfers == min(MAX_FREE_TRANSFERS, unused + 1)
+
+
+def test_bank_never_goes_negative(pool):
+    df, squad = pool
+    # The best players are the most expensive ones, more than the bank can pay for
+    points = df["start_cost"].to_numpy() ** 2
+    expected = expected_for(df, points)
+    squad_value = df.loc[df["id"].isin(squad), "start_cost"].sum()
+    selling_prices = {player: cost - 0.5 for player, cost in df.set_index("id").loc[squad, "start_cost"].items()}
+    transfers, squads, summary = plan_transfers(
+        df, squad, 2.0, 1, expected, horizon=3, window=2, selling_prices=selling_prices
+    )
+
+    assert len(transfers)
+    assert (summary["bank"] >= 0).all()
+    for event, row in zip(EVENTS, summary.itertuples()):
+        squad_cost = squads.loc[squads["event"] == event, "start_cost"].sum()
+        assert len(squads[squads["event"] == event]) == 15
+        assert squad_cost <= squad_value + 2.0
+    # A squad player sold goes at its selling price: the bank after the first gameweek adds those up
+    first = transfers[transfers["event"] == EVENTS[0]]
+    costs = df.set_index("id")["start_cost"]
+    sold = sum(selling_prices[player] for player in first.loc[first["direction"] == "out", "id"])
+    bought = costs.loc[first.loc[first["direction"] == "in", "id"]].sum()
+    assert summary["bank"].iloc[0] == pytest.approx(2.0 + sold - bought)
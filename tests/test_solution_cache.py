@@ -0,0 +1,51 @@
+# SolutionCache: results are kept per table snapshot and evicted least recently used
+import pandas as pd
+
+from squad_selection.solution_cache import SolutionCache
+
+
+def solver(calls, value):
+    def solve():
+        calls.append(value)
+        return value
+
+    return solve
+
+
+def test_alternating_snapshots_keep_their_entries():
+    cache = SolutionCache()
+    calls = []
+    for _ in range(3):
+        cache.get_or_solve("weights a", "full_squad", solver(calls, "a"), budget=100)
+        cache.get_or_solve("weights b", "full_squad", solver(calls, "b"), budget=100)
+    assert calls == ["a", "b"]
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_least_recently_used_snapshot_is_evicted():
+    cache = SolutionCache(max_snapshots=2)
+    calls = []
+    cache.get_or_solve("old", "full_squad", solver(calls, "old"))
+    cache.get_or_solve("kept", "full_squad", solver(calls, "kept"))
+    cache.get_or_solve("kept", "full_squad", solver(calls, "kept"))
+    cache.get_or_solve("new", "full_squad", solver(calls, "new"))
+
+    cache.get_or_solve("kept", "full_squad", solver(calls, "kept"))
+    cache.get_or_solve("old", "full_squad", solver(calls, "old"))
+    assert calls == ["old", "kept", "new", "old"]
+
+
+def test_maxsize_evicts_least_recently_used_entries():
+    cache = SolutionCache(maxsize=2)
+    calls = []
+    for budget in [1, 2, 1, 3, 2]:
+        cache.get_or_solve("snapshot", "full_squad", solver(calls, budget), budget=budget)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_cached_frames_are_copies():
+    cache = SolutionCache()
+    cache.get_or_solve("snapshot", "full_squad", lambda: pd.DataFrame({"a": [1]}))
+    cached = cache.get_or_solve("snapshot", "full_squad", lambda: None)
+    cached["a"] = 2
+    assert cache.get_or_solve("snapshot", "full_squad", lambda: None)["a"].tolist() == [1]
@@ -0,0 +1,17 @@
+# SolveResult reports one consistent status, whether or not the search ran to optimality
+from pulp import LpSolutionInfeasible, LpSolutionIntegerFeasible, LpSolutionOptimal, LpStatusInfeasible, LpStatusOptimal
+
+from squad_selection.solvers import SolveResult
+
+
+def test_time_limited_solve_is_not_reported_optimal():
+    # What CBC reports when the time limit stops it with a squad in hand
+    result = SolveResult("cbc", LpStatusOptimal, LpSolutionIntegerFeasible, 10.0, 0.05)
+    assert result.has_solution and not result.optimal
+    assert result.status_name == "Solution Found"
+    assert "status='Solution Found', optimal=False" in repr(result)
+
+
+def test_status_names():
+    assert SolveResult("cbc", LpStatusOptimal, LpSolutionOptimal, 10.0, 0.1).status_name == "Optimal Solution Found"
+    assert SolveResult("cbc", LpStatusInfeasible, LpSolutionInfeasible, None, 0.1).status_name == "No Solution Exists"
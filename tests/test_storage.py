@@ -0,0 +1,80 @@
+# The per-gameweek snapshot on disk: rewrites of a round or of the whole season are swapped in, so a reader never finds
+# them missing or half written
+import os
+
+import pandas as pd
+
+from storage import (
+    final_rounds,
+    migrate_legacy_gw_csv,
+    read_gw_snapshot,
+    snapshot_rounds,
+    write_gw_round,
+    write_gw_snapshot,
+)
+
+
+def round_frame(gw, points):
+    return pd.DataFrame({"element": [1, 2], "round": gw, "total_points": points})
+
+
+def test_rewrite_replaces_the_round(tmp_path):
+    root = str(tmp_path)
+    write_gw_snapshot(pd.concat([round_frame(1, [1, 2]), round_frame(2, [3, 4])]), root=root)
+    write_gw_round(round_frame(2, [5, 6]), 2, root=root)
+
+    df = read_gw_snapshot(root=root)
+    assert df.loc[df["round"] == 2, "total_points"].tolist() == [5, 6]
+    assert sorted(os.listdir(root)) == ["_manifest.json", "round=1", "round=2"]
+
+
+def test_round_mid_swap_is_read_from_the_old_copy(tmp_path):
+    # What a reader sees between write_gw_round's two renames: the old partition moved aside, the new one not yet in
+    root = str(tmp_path)
+    write_gw_snapshot(pd.concat([round_frame(1, [1, 2]), round_frame(2, [3, 4])]), root=root)
+    os.rename(os.path.join(root, "round=2"), os.path.join(root, "round=2.old"))
+
+    assert snapshot_rounds(root) == [1, 2]
+    df = read_gw_snapshot(root=root)
+    assert df.loc[df["round"] == 2, "total_points"].tolist() == [3, 4]
+
+    # The next write clears the leftover copy
+    write_gw_round(round_frame(2, [5, 6]), 2, root=root)
+    assert not os.path.exists(os.path.join(root, "round=2.old"))
+    df = read_gw_snapshot(root=root)
+    assert df.loc[df["round"] == 2, "total_points"].tolist() == [5, 6]
+
+
+def test_snapshot_mid_swap_is_read_from_the_old_copy(tmp_path):
+    # What a reader sees between write_gw_snapshot's two renames: the old season moved aside, the new one not yet in
+    root = str(tmp_path / "snapshot")
+    write_gw_snapshot(pd.concat([round_frame(1, [1, 2]), round_frame(2, [3, 4])]), root=root, final_rounds=[1])
+    os.rename(root, root + ".old")
+
+    assert snapshot_rounds(root) == [1, 2]
+    assert final_rounds(root) == {1}
+    assert read_gw_snapshot(root=root)["total_points"].tolist() == [1, 2, 3, 4]
+
+
+def test_snapshot_rewrite_is_built_aside(tmp_path):
+    root = str(tmp_path / "snapshot")
+    write_gw_snapshot(pd.concat([round_frame(1, [1, 2]), round_frame(2, [3, 4])]), root=root)
+    write_gw_snapshot(round_frame(1, [5, 6]), root=root)
+
+    assert read_gw_snapshot(root=root)["total_points"].tolist() == [5, 6]
+    assert sorted(os.listdir(tmp_path)) == ["snapshot"]
+
+
+def test_legacy_csv_is_migrated_once(tmp_path):
+    root = str(tmp_path / "snapshot")
+    path = str(tmp_path / "legacy.csv")
+    round_frame(1, [1, 2]).to_csv(path, index=False)
+
+    assert migrate_legacy_gw_csv(path, root=root)
+    assert read_gw_snapshot(root=root)["total_points"].tolist() == [1, 2]
+    assert not os.path.exists(path)
+
+    # A later refresh rewrites the snapshot; there is no CSV left to migrate over it
+    write_gw_snapshot(round_frame(1, [5, 6]), root=root)
+    assert not migrate_legacy_gw_csv(path, root=root)
+    assert read_gw_snapshot(root=root)["total_points"].tolist() == [5, 6]
@@ -0,0 +1,77 @@
+# Budget sweep: splits that can only give the same squad are solved once, and the Pareto frontier
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers import synthetic_players, total_rating
+from squad_selection.optimiztion import SQUAD_SIZE, SquadOptimizer
+from squad_selection.sweep import _effective_budgets, budget_sweep, pareto_frontier
+
+RANGES = {"Defender": (34, 36), "Midfielder": (44, 46), "Forward": (27, 27)}
+
+
+@pytest.fixture(scope="module")
+def df():
+    return synthetic_players(250, seed=0)
+
+
+def most_spent(df, position):
+    costs = np.sort(df.loc[df["singular_name"] == position, "start_cost"].to_numpy())
+    return round(float(costs[-SQUAD_SIZE[position] :].sum()), 1)
+
+
+def test_budgets_are_only_capped_from_above(df):
+    high = {position: most_spent(df, position) for position in SQUAD_SIZE}
+    above = {position: high[position] + 5 for position in SQUAD_SIZE}
+    assert _effective_budgets(df, above) == tuple(high.values())
+
+    # Budgets under the cheapest squad are left alone, so two of them stay two problems
+    low = {position: 1.0 for position in SQUAD_SIZE}
+    lower = {position: 0.5 for position in SQUAD_SIZE}
+    assert _effective_budgets(df, low) == tuple(low.values())
+    assert _effective_budgets(df, low) != _effective_budgets(df, lower)
+
+
+def test_sweep_matches_solving_every_split(df):
+    # The goalkeeper range runs past the most two goalkeepers can cost, so some splits share a sub-problem
+    high = most_spent(df, "Goalkeeper")
+    ranges = {"Goalkeeper": (high - 2, high + 2), **RANGES}
+    results_df, frontier_df, best_split = budget_sweep(
+        df, step=2.0, total_budget=200, budget_ranges=ranges, max_workers=2
+    )
+
+    # Every split of the grid keeps its row; the two past the cap share one squad
+    assert len(results_df.drop_duplicates(subset=list(SQUAD_SIZE))) == len(results_df) == 12
+    outfield = [position for position in SQUAD_SIZE if position != "Goalkeeper"]
+    capped = results_df[results_df["Goalkeeper"] >= high].groupby(outfield)["players"].nunique()
+    assert (capped == 1).all() and len(capped) == 4
+    optimizer = SquadOptimizer(df)
+    for row in results_df.itertuples():
+        squad = optimizer.solve({position: getattr(row, position) for position in SQUAD_SIZE})
+        assert row.total_rating == pytest.approx(total_rating(df, squad))
+    best = results_df["total_rating"].max()
+    assert total_rating(df, optimizer.solve(best_split)) == pytest.approx(best)
+    assert frontier_df.equals(pareto_frontier(results_df))
+
+
+def test_pareto_frontier_keeps_only_undominated_squads():
+    rng = np.random.default_rng(0)
+    results_df = pd.DataFrame(
+        {"total_rating": rng.integers(50, 70, 60).astype(float), "total_cost": rng.integers(80, 100, 60).astype(float)}
+    )
+    results_df.loc[::7, "total_rating"] = np.nan
+    frontier_df = pareto_frontier(results_df)
+
+    feasible = results_df.dropna()
+    undominated = [
+        not (
+            (feasible["total_rating"] >= row.total_rating)
+            & (feasible["total_cost"] <= row.total_cost)
+            & ((feasible["total_rating"] > row.total_rating) | (feasible["total_cost"] < row.total_cost))
+        ).any()
+        for row in feasible.itertuples()
+    ]
+    expected = feasible[undominated].drop_duplicates().sort_values("total_cost")
+    np.testing.assert_array_equal(frontier_df[["total_rating", "total_cost"]].to_numpy(), expected.to_numpy())
+    # Cheaper squads along the frontier are always worse
+    assert frontier_df["total_cost"].is_monotonic_increasing and frontier_df["total_rating"].is_monotonic_increasing